@@ -33,6 +33,25 @@ assert any(app in INSTALLED_APPS for app in ['posts.apps.PostsConfig', 'posts'])
     'Пожалуйста зарегистрируйте приложение в `settings.INSTALLED_APPS`'
 )
 
+import shutil
+import tempfile
+
+import pytest
+
+from core import querylog
+from core.testing import isolated_settings
+
+
+@pytest.fixture(scope='session', autouse=True)
+def isolated_files():
+    """Кэш и журнал запросов тестов — не файлы dev-сервера."""
+    directory = tempfile.mkdtemp()
+    with isolated_settings(directory):
+        yield
+        querylog.flush(force=True)
+    shutil.rmtree(directory, ignore_errors=True)
+
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
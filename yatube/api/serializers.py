@@ -0,0 +1,77 @@
+"""Сериализация постов и комментариев в JSON.
+
+Каждое поле ответа знает, какие колонки ему нужны. Querysets из
+posts.feeds сужаются через only() до колонок запрошенных полей
+(?fields=id,text), так что выборка остаётся одним запросом с JOIN, а
+лишние колонки не читаются.
+"""
+
+
+def _image(request, post):
+    return request.build_absolute_uri(post.image.url) if post.image else None
+
+
+def _slug(obj):
+    return obj.slug if obj is not None else None
+
+
+# Имя поля: (колонки для only(), функция от request и объекта).
+POST_FIELDS = {
+    'id': ((), lambda request, post: post.pk),
+    'text': (('text',), lambda request, post: post.text),
+    'pub_date': (('pub_date',), lambda request, post: post.pub_date),
+    'updated': (('updated',), lambda request, post: post.updated),
+    'author': (
+        ('author__username',),
+        lambda request, post: post.author.username,
+    ),
+    'group': (('group__slug',), lambda request, post: _slug(post.group)),
+    'image': (('image',), _image),
+    'comments_count': (
+        ('comments_count',),
+        lambda request, post: post.comments_count,
+    ),
+}
+# Связи, которые querysets лент подтягивают через select_related: их
+# нельзя отложить, иначе only() несовместим с select_related.
+POST_RELATIONS = ('author', 'group')
+
+COMMENT_FIELDS = {
+    'id': ((), lambda request, comment: comment.pk),
+    'post': (('post',), lambda request, comment: comment.post_id),
+    'text': (('text',), lambda request, comment: comment.text),
+    'created': (('created',), lambda request, comment: comment.created),
+    'author': (
+        ('author__username',),
+        lambda request, comment: comment.author.username,
+    ),
+}
+COMMENT_RELATIONS = ('author',)
+
+
+def parse_fields(value, available):
+    """Список полей из ?fields=. ValueError, если поле неизвестно."""
+    if not value:
+        return list(available)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(', '.join(unknown))
+    return list(dict.fromkeys(names))
+
+
+def restrict(queryset, available, relations, names, ordering=()):
+    """Оставляет в queryset только колонки выбранных полей и сортировки."""
+    columns = set(relations)
+    columns.update(name.lstrip('-') for name in ordering)
+    columns.discard('pk')
+    for name in names:
+        columns.update(available[name][0])
+    return queryset.only(*columns)
+
+
+def serialize(request, objects, available, names):
+    return [
+        {name: available[name][1](request, obj) for name in names}
+        for obj in objects
+    ]
@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+from ..views import PAGE_SIZE
+
+User = get_user_model()
+
+
+class ApiViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for number in range(PAGE_SIZE + 2):
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group
+            )
+        cls.post = Post.objects.latest('pk')
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {number}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_are_paginated_by_cursor(self):
+        urls = [
+            reverse('api_v1:index'),
+            reverse('api_v1:group_list', args=(self.group.slug,)),
+            reverse('api_v1:profile', args=(self.author.username,)),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(len(data['results']), PAGE_SIZE)
+                self.assertEqual(data['results'][0]['id'], self.post.pk)
+                self.assertEqual(data['results'][0]['author'], 'author')
+                self.assertEqual(data['results'][0]['group'], 'group')
+                self.assertIsNone(data['previous'])
+                next_page = self.client.get(data['next']).json()
+                self.assertEqual(len(next_page['results']), 2)
+                self.assertIsNone(next_page['next'])
+
+    def test_sparse_fields_limit_payload_and_columns(self):
+        url = reverse('api_v1:index')
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url, {'fields': 'id,text'}).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        feed_query = next(
+            query['sql'] for query in queries
+            if 'FROM "posts_post"' in query['sql']
+        )
+        self.assertNotIn('"image"', feed_query)
+        self.assertNotIn('"comments_count"', feed_query)
+
+        response = self.client.get(url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        url = reverse('api_v1:index')
+        next_url = self.client.get(url).json()['next']
+        cache.clear()
+        with CaptureQueriesContext(connection) as full_page:
+            self.client.get(url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as short_page:
+            self.client.get(next_url)
+        self.assertEqual(len(full_page), len(short_page))
+
+    def test_post_detail_and_comments(self):
+        data = self.client.get(
+            reverse('api_v1:post_detail', args=(self.post.pk,))
+        ).json()
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(data['comments_count'], 3)
+        self.assertIsNone(data['image'])
+
+        data = self.client.get(
+            reverse('api_v1:post_comments', args=(self.post.pk,))
+        ).json()
+        self.assertEqual(
+            [comment['text'] for comment in data['results']],
+            ['Комментарий 0', 'Комментарий 1', 'Комментарий 2'],
+        )
+        self.assertEqual(data['results'][0]['author'], 'reader')
+
+        response = self.client.get(reverse('api_v1:post_detail', args=(0,)))
+        self.assertEqual(response.status_code, 404)
+
+    def test_follow_feed_requires_login(self):
+        url = reverse('api_v1:follow_index')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+        data = self.client.get(url).json()
+        self.assertEqual(data['results'][0]['id'], self.post.pk)
+
+    def test_responses_are_cacheable(self):
+        url = reverse('api_v1:index')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.post(url).status_code, 405)
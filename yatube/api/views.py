@@ -0,0 +1,143 @@
+"""JSON API v1 только для чтения.
+
+Ленты, пост и комментарии отдаются из тех же querysets, что и
+HTML-страницы (posts.feeds), с курсорной пагинацией (?after=, ?before=)
+и выбором полей (?fields=). Ответы кэшируются и поддерживают условные
+GET так же, как страницы сайта.
+"""
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from posts import caching, feeds
+from posts.models import Group, Post
+from posts.paginators import CursorPaginator
+
+from . import serializers
+
+User = get_user_model()
+PAGE_SIZE = 20
+FEED_ORDERING = ('-pub_date', '-pk')
+COMMENTS_ORDERING = ('created', 'pk')
+
+
+def error(status, message):
+    return JsonResponse({'detail': message}, status=status)
+
+
+def _page_url(request, cursor_name, cursor):
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+    params[cursor_name] = cursor
+    return request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+
+def paginated(request, queryset, available, relations, ordering,
+              keys=None):
+    """Страница объектов queryset в формате {results, next, previous}."""
+    try:
+        names = serializers.parse_fields(request.GET.get('fields'), available)
+    except ValueError as unknown:
+        return error(400, f'Неизвестные поля: {unknown}')
+    pages = CursorPaginator(
+        serializers.restrict(
+            queryset, available, relations, names, ordering
+        ),
+        PAGE_SIZE,
+        ordering=ordering,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        keys=keys,
+    )
+    page = pages.get_page()
+    return JsonResponse({
+        'results': serializers.serialize(request, page, available, names),
+        'next': pages.has_next and _page_url(
+            request, 'after', pages.next_cursor
+        ) or None,
+        'previous': pages.has_previous and _page_url(
+            request, 'before', pages.previous_cursor
+        ) or None,
+    })
+
+
+def post_feed(request, queryset, keys=None):
+    return paginated(
+        request,
+        queryset,
+        serializers.POST_FIELDS,
+        serializers.POST_RELATIONS,
+        FEED_ORDERING,
+        keys,
+    )
+
+
+@require_safe
+@caching.cache_feed(lambda request: caching.INDEX)
+def index(request):
+    return post_feed(request, feeds.index_feed())
+
+
+@require_safe
+@caching.cache_feed(lambda request, slug: caching.group_key(slug))
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return error(404, 'Группа не найдена')
+    return post_feed(request, feeds.group_feed(group))
+
+
+@require_safe
+@caching.cache_feed(
+    lambda request, username: caching.author_key(username)
+)
+def profile(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return error(404, 'Пользователь не найден')
+    return post_feed(request, feeds.profile_feed(author))
+
+
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error(401, 'Нужна авторизация')
+    return _follow_index(request)
+
+
+@require_safe
+@caching.cache_feed(lambda request: caching.follow_keys(request.user.pk))
+def _follow_index(request):
+    return post_feed(request, *feeds.follow_feed(request.user))
+
+
+@require_safe
+@caching.conditional_post
+def post_detail(request, post_id):
+    available = serializers.POST_FIELDS
+    try:
+        names = serializers.parse_fields(request.GET.get('fields'), available)
+    except ValueError as unknown:
+        return error(400, f'Неизвестные поля: {unknown}')
+    post = serializers.restrict(
+        feeds.index_feed(), available, serializers.POST_RELATIONS, names
+    ).filter(pk=post_id).first()
+    if post is None:
+        return error(404, 'Пост не найден')
+    return JsonResponse(
+        serializers.serialize(request, [post], available, names)[0]
+    )
+
+
+@require_safe
+@caching.conditional_post
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return error(404, 'Пост не найден')
+    return paginated(
+        request,
+        feeds.post_comments(Post(pk=post_id)),
+        serializers.COMMENT_FIELDS,
+        serializers.COMMENT_RELATIONS,
+        COMMENTS_ORDERING,
+    )
@@ -0,0 +1,20 @@
+"""Бенчмарки производительности страниц.
+
+Набор не входит в обычный прогон тестов: файлы называются bench_*.py.
+Запуск из каталога yatube:
+
+    python manage.py test benchmarks --pattern='bench_*.py'
+
+Переменные окружения:
+
+    BENCHMARK_SCALE — множитель объёма данных (по умолчанию 1);
+    BENCHMARK_SAMPLES — число замеров каждой страницы;
+    BENCHMARK_UPDATE_BASELINE=1 — записать замеры в базлайн;
+    BENCHMARK_REPORT — путь, куда сохранить отчёт в JSON.
+
+По умолчанию прогон падает, только если страница делает больше запросов,
+чем в baseline.json, или выходит за бюджет из budgets.py. baseline.json
+хранит одно число запросов: оно не зависит от машины. Время и память
+BENCHMARK_UPDATE_BASELINE=1 пишет в baseline.local.json, который не
+коммитится; если этот файл есть, регрессии по ним тоже проверяются.
+"""
@@ -0,0 +1,307 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.db.models import Count
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from posts import synthetic
+from posts import urls as posts_urls
+from posts.models import Follow, Group, Post
+from users import urls as users_urls
+
+from .budgets import (BUDGETS, LATENCY_NOISE_MS, LATENCY_TOLERANCE,
+                      MEMORY_TOLERANCE)
+from .measure import measure
+
+User = get_user_model()
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+# Время и память зависят от машины, поэтому их базлайн не коммитится.
+LOCAL_BASELINE_PATH = os.path.join(
+    os.path.dirname(__file__), 'baseline.local.json'
+)
+QUERY_FIELDS = ('queries',)
+TIMING_FIELDS = ('p50_ms', 'p95_ms', 'memory_kb')
+DATASET = {
+    'users': 2000,
+    'groups': 50,
+    'posts': 20000,
+    'comments': 50000,
+    'follows': 30000,
+}
+SAMPLES = int(os.environ.get('BENCHMARK_SAMPLES', 15))
+SCALE = float(os.environ.get('BENCHMARK_SCALE', 1))
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+Case = namedtuple('Case', 'client method path data before status')
+
+
+def _url_names(module):
+    return {
+        f'{module.app_name}:{pattern.name}' for pattern in module.urlpatterns
+    }
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False, indent=2)
+        file.write('\n')
+
+
+def load_baseline():
+    """Запросы из baseline.json и, если есть, время и память этой машины."""
+    baseline = _read_json(BASELINE_PATH)
+    for name, timings in _read_json(LOCAL_BASELINE_PATH).items():
+        if name in baseline:
+            baseline[name].update(timings)
+    return baseline
+
+
+def save_baseline(results):
+    for path, fields in (
+        (BASELINE_PATH, QUERY_FIELDS), (LOCAL_BASELINE_PATH, TIMING_FIELDS)
+    ):
+        _write_json(path, {
+            name: {field: result[field] for field in fields}
+            for name, result in results.items()
+        })
+
+
+def regressions(measurement, baseline):
+    """Чем замер хуже базлайна: список описаний, пустой — всё в порядке.
+
+    Время и память сравниваются, только если в базлайне они есть.
+    """
+    found = []
+    if measurement.queries > baseline['queries']:
+        found.append(
+            f'запросов {measurement.queries}, было {baseline["queries"]}'
+        )
+    if 'p95_ms' not in baseline:
+        return found
+    limit = max(
+        baseline['p95_ms'] * LATENCY_TOLERANCE,
+        baseline['p95_ms'] + LATENCY_NOISE_MS,
+    )
+    if measurement.p95_ms > limit:
+        found.append(
+            f'p95 {measurement.p95_ms} мс, было {baseline["p95_ms"]} мс'
+        )
+    if measurement.memory_kb > baseline['memory_kb'] * MEMORY_TOLERANCE:
+        found.append(
+            f'память {measurement.memory_kb} КБ, '
+            f'было {baseline["memory_kb"]} КБ'
+        )
+    return found
+
+
+def overruns(measurement, budget):
+    """Какие потолки бюджета превышены."""
+    return [
+        f'{name} {getattr(measurement, name)} > {getattr(budget, name)}'
+        for name in budget._fields
+        if getattr(measurement, name) > getattr(budget, name)
+    ]
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ViewBudgetsBenchmark(TestCase):
+    """Все страницы posts и users на большом наборе данных."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        synthetic.run(
+            **{name: round(count * SCALE) for name, count in DATASET.items()},
+            generate_thumbnails=False,
+            seed=1,
+        )
+        cls.author = User.objects.annotate(
+            total=Count('posts')
+        ).order_by('-total').first()
+        cls.reader = User.objects.annotate(
+            total=Count('follower')
+        ).order_by('-total').first()
+        cls.target = User.objects.exclude(
+            following__user=cls.reader
+        ).exclude(pk=cls.reader.pk).order_by('pk').first()
+        cls.post = Post.objects.order_by('-comments_count').first()
+        cls.group = Group.objects.annotate(
+            total=Count('posts')
+        ).order_by('-total').first()
+        cls.query = max(cls.post.text.split(), key=len).strip('.,')
+        # Свой пользователь: вход других клиентов меняет last_login, а с
+        # ним и токен сброса пароля.
+        cls.resetting = User.objects.create_user(username='resetting')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.guest = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.post.author)
+
+    def cases(self):
+        reader, target, post = self.reader, self.target, self.post
+        uid = urlsafe_base64_encode(force_bytes(self.resetting.pk))
+        token = default_token_generator.make_token(self.resetting)
+
+        def unfollow():
+            Follow.objects.filter(user=reader, author=target).delete()
+
+        def follow():
+            Follow.objects.get_or_create(user=reader, author=target)
+
+        def login():
+            self.reader_client.force_login(reader)
+
+        guest, member = self.guest, self.reader_client
+        return {
+            'posts:index': Case(guest, 'get', reverse('posts:index'),
+                                None, None, 200),
+            'posts:group_list': Case(
+                guest, 'get',
+                reverse('posts:group_list', args=(self.group.slug,)),
+                None, None, 200,
+            ),
+            'posts:profile': Case(
+                guest, 'get',
+                reverse('posts:profile', args=(self.author.username,)),
+                None, None, 200,
+            ),
+            'posts:post_detail': Case(
+                guest, 'get', reverse('posts:post_detail', args=(post.pk,)),
+                None, None, 200,
+            ),
+            'posts:post_comments': Case(
+                guest, 'get',
+                reverse('posts:post_comments', args=(post.pk,)),
+                None, None, 200,
+            ),
+            'posts:post_create': Case(
+                member, 'get', reverse('posts:post_create'), None, None, 200,
+            ),
+            'posts:post_edit': Case(
+                self.author_client, 'get',
+                reverse('posts:post_edit', args=(post.pk,)),
+                None, None, 200,
+            ),
+            'posts:add_comment': Case(
+                member, 'post', reverse('posts:add_comment', args=(post.pk,)),
+                {'text': 'Комментарий из бенчмарка'}, None, 302,
+            ),
+            'posts:post_search': Case(
+                guest, 'get', reverse('posts:post_search'),
+                {'q': self.query}, None, 200,
+            ),
+            'posts:follow_index': Case(
+                member, 'get', reverse('posts:follow_index'),
+                None, None, 200,
+            ),
+            'posts:profile_follow': Case(
+                member, 'get',
+                reverse('posts:profile_follow', args=(target.username,)),
+                None, unfollow, 302,
+            ),
+            'posts:profile_unfollow': Case(
+                member, 'get',
+                reverse('posts:profile_unfollow', args=(target.username,)),
+                None, follow, 302,
+            ),
+            'users:logout': Case(
+                member, 'get', reverse('users:logout'), None, login, 200,
+            ),
+            'users:signup': Case(
+                guest, 'get', reverse('users:signup'), None, None, 200,
+            ),
+            'users:login': Case(
+                guest, 'get', reverse('users:login'), None, None, 200,
+            ),
+            'users:password_change_form': Case(
+                member, 'get', reverse('users:password_change_form'),
+                None, login, 200,
+            ),
+            'users:password_change_done': Case(
+                member, 'get', reverse('users:password_change_done'),
+                None, login, 200,
+            ),
+            'users:password_reset_form': Case(
+                guest, 'get', reverse('users:password_reset_form'),
+                None, None, 200,
+            ),
+            'users:password_reset_done': Case(
+                guest, 'get', reverse('users:password_reset_done'),
+                None, None, 200,
+            ),
+            'users:password_reset_confirm': Case(
+                guest, 'get',
+                reverse('users:password_reset_confirm', args=(uid, token)),
+                None, None, 302,
+            ),
+            'users:password_reset_complete': Case(
+                guest, 'get', reverse('users:password_reset_complete'),
+                None, None, 200,
+            ),
+        }
+
+    def test_every_url_has_a_case_and_budget(self):
+        names = _url_names(posts_urls) | _url_names(users_urls)
+        self.assertEqual(set(self.cases()), names)
+        self.assertEqual(set(BUDGETS), names)
+
+    def test_views_stay_within_budgets(self):
+        baseline = load_baseline()
+        results = {}
+        for name, case in sorted(self.cases().items()):
+            request = getattr(case.client, case.method)
+            response, measurement = measure(
+                lambda: request(case.path, case.data),
+                SAMPLES,
+                case.before,
+            )
+            results[name] = measurement._asdict()
+            with self.subTest(view=name):
+                self.assertEqual(response.status_code, case.status)
+                self.assertEqual(overruns(measurement, BUDGETS[name]), [])
+                if name in baseline:
+                    self.assertEqual(
+                        regressions(measurement, baseline[name]), []
+                    )
+        self.report(results)
+
+    def report(self, results):
+        lines = [f'\n{"страница":32} {"SQL":>4} {"p50":>7} {"p95":>7} '
+                 f'{"КБ":>6}']
+        for name, result in results.items():
+            lines.append(
+                f'{name:32} {result["queries"]:>4} {result["p50_ms"]:>7} '
+                f'{result["p95_ms"]:>7} {result["memory_kb"]:>6}'
+            )
+        sys.stderr.write('\n'.join(lines) + '\n')
+        report_path = os.environ.get('BENCHMARK_REPORT')
+        if report_path:
+            _write_json(report_path, results)
+        if os.environ.get('BENCHMARK_UPDATE_BASELINE'):
+            save_baseline(results)
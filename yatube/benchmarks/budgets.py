@@ -0,0 +1,45 @@
+"""Бюджеты страниц: потолки, которые нельзя превышать при любом базлайне.
+
+Число запросов — точное: оно не зависит от машины, и лишний запрос —
+это почти всегда N+1. Время и память зависят от машины, поэтому
+потолки у них с запасом, а регрессии ловит сравнение с локальным
+baseline.local.json (см. пакет benchmarks).
+"""
+from collections import namedtuple
+
+Budget = namedtuple('Budget', 'queries p95_ms memory_kb')
+
+# Во сколько раз замер может превысить базлайн, прежде чем считаться
+# регрессией. Запросы сравниваются без допуска.
+LATENCY_TOLERANCE = 1.5
+MEMORY_TOLERANCE = 1.25
+# Разница меньше этой — шум таймера, а не регрессия.
+LATENCY_NOISE_MS = 5
+
+BUDGETS = {
+    'posts:index': Budget(queries=1, p95_ms=250, memory_kb=1024),
+    'posts:group_list': Budget(queries=2, p95_ms=150, memory_kb=1024),
+    'posts:profile': Budget(queries=3, p95_ms=150, memory_kb=1024),
+    'posts:post_detail': Budget(queries=4, p95_ms=100, memory_kb=1024),
+    'posts:post_comments': Budget(queries=2, p95_ms=100, memory_kb=512),
+    'posts:post_create': Budget(queries=5, p95_ms=100, memory_kb=1024),
+    'posts:post_edit': Budget(queries=5, p95_ms=100, memory_kb=1024),
+    'posts:add_comment': Budget(queries=9, p95_ms=100, memory_kb=512),
+    'posts:post_search': Budget(queries=1, p95_ms=400, memory_kb=1024),
+    'posts:follow_index': Budget(queries=5, p95_ms=200, memory_kb=1024),
+    'posts:profile_follow': Budget(queries=16, p95_ms=250, memory_kb=2048),
+    'posts:profile_unfollow': Budget(queries=12, p95_ms=100, memory_kb=512),
+    'users:logout': Budget(queries=4, p95_ms=50, memory_kb=256),
+    'users:signup': Budget(queries=1, p95_ms=50, memory_kb=512),
+    'users:login': Budget(queries=0, p95_ms=50, memory_kb=256),
+    'users:password_change_form': Budget(queries=2, p95_ms=50, memory_kb=512),
+    'users:password_change_done': Budget(queries=2, p95_ms=50, memory_kb=256),
+    'users:password_reset_form': Budget(queries=1, p95_ms=50, memory_kb=256),
+    'users:password_reset_done': Budget(queries=1, p95_ms=50, memory_kb=256),
+    'users:password_reset_confirm': Budget(
+        queries=5, p95_ms=50, memory_kb=256
+    ),
+    'users:password_reset_complete': Budget(
+        queries=0, p95_ms=50, memory_kb=256
+    ),
+}
@@ -0,0 +1,65 @@
+"""Замер одного запроса: число SQL-запросов, задержка и пик памяти."""
+import gc
+import statistics
+import time
+import tracemalloc
+from collections import namedtuple
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts import caching
+
+Measurement = namedtuple('Measurement', 'queries p50_ms p95_ms memory_kb')
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = max(0, round(len(ordered) * percent / 100) - 1)
+    return ordered[index]
+
+
+def _prepare(before):
+    if before is not None:
+        before()
+    # Новое поколение SITE сбрасывает страницы всех лент: меряется
+    # рендер, а не чтение из кэша. Остальной кэш (миниатюры, популярные
+    # авторы) остаётся тёплым, как на живом сайте.
+    caching.bump(caching.SITE)
+
+
+def measure(request, samples, before=None):
+    """Меряет request() samples раз после одного прогревочного вызова.
+
+    before() выполняется перед каждым вызовом вне замера: например,
+    возвращает состояние, которое изменил предыдущий вызов. Память
+    меряется отдельным вызовом: tracemalloc замедляет код в разы и
+    исказил бы время.
+    """
+    _prepare(before)
+    request()
+    timings = []
+    for _ in range(samples):
+        _prepare(before)
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = request()
+            timings.append((time.perf_counter() - start) * 1000)
+        # Список запросов читается лениво из журнала соединения, а
+        # следующий запрос клиента журнал очищает.
+        query_count = len(queries)
+    _prepare(before)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        request()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    measurement = Measurement(
+        queries=query_count,
+        p50_ms=round(statistics.median(timings), 1),
+        p95_ms=round(_percentile(timings, 95), 1),
+        memory_kb=round(peak / 1024),
+    )
+    return response, measurement
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import profiling, querylog
+        profiling.install()
+        connection_created.connect(querylog.install)
+        request_finished.connect(querylog.flush)
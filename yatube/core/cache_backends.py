@@ -0,0 +1,245 @@
+"""Кэш в файле SQLite, общий для всех процессов на одной машине.
+
+В отличие от LocMemCache один и тот же файл видят все WSGI-воркеры:
+закэшированная страница переиспользуется любым процессом, а сброс
+поколения ленты сразу виден всем. Внешний сервер не нужен.
+
+Подключение в settings.CACHES::
+
+    'default': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': '/path/to/cache.sqlite3',
+        'OPTIONS': {'MAX_ENTRIES': 10000, 'CULL_FREQUENCY': 3},
+    }
+
+Записи вытесняются по сроку жизни (TIMEOUT) и, когда их больше
+MAX_ENTRIES, по давности последнего чтения (LRU).
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .profiling import record_cache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+    'expires REAL, accessed REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+)
+# Время последнего чтения обновляется не чаще раза в секунду, чтобы
+# горячие ключи не превращали каждое чтение в запись.
+ACCESS_RESOLUTION = 1.0
+BUSY_TIMEOUT = 5.0
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _dumps(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _fetch(self, connection, keys, now):
+        placeholders = ', '.join('?' * len(keys))
+        rows = connection.execute(
+            f'SELECT key, value, accessed FROM cache '
+            f'WHERE key IN ({placeholders}) '
+            f'AND (expires IS NULL OR expires > ?)',
+            [*keys, now],
+        ).fetchall()
+        stale = [
+            key for key, _, accessed in rows
+            if now - accessed > ACCESS_RESOLUTION
+        ]
+        if stale:
+            placeholders = ', '.join('?' * len(stale))
+            connection.execute(
+                f'UPDATE cache SET accessed = ? '
+                f'WHERE key IN ({placeholders})',
+                [now, *stale],
+            )
+        return {key: pickle.loads(value) for key, value, _ in rows}
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        values = self._fetch(self._connection(), [key], time.time())
+        record_cache(len(values), 1 - len(values))
+        return values.get(key, default)
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        key_map = {self.make_key(key, version=version): key for key in keys}
+        for key in key_map:
+            self.validate_key(key)
+        values = self._fetch(self._connection(), list(key_map), time.time())
+        record_cache(len(values), len(key_map) - len(values))
+        return {key_map[key]: value for key, value in values.items()}
+
+    def _write(self, connection, key, value, timeout, mode):
+        """mode: 'set' — перезаписать, 'add' — только если ключа нет."""
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        if mode == 'add':
+            exists = connection.execute(
+                'SELECT 1 FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (key, now),
+            ).fetchone()
+            if exists:
+                return False
+        connection.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires, accessed) '
+            'VALUES (?, ?, ?, ?)',
+            (key, self._dumps(value), expires, now),
+        )
+        return True
+
+    def _transaction(self, func, *args):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = func(connection, *args)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._transaction(self._set_many, [(key, value)], timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._transaction(self._write_culled, key, value, timeout)
+
+    def _write_culled(self, connection, key, value, timeout):
+        written = self._write(connection, key, value, timeout, 'add')
+        if written:
+            self._cull(connection)
+        return written
+
+    def _set_many(self, connection, items, timeout):
+        for key, value in items:
+            self._write(connection, key, value, timeout, 'set')
+        self._cull(connection)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = []
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            items.append((key, value))
+        if items:
+            self._transaction(self._set_many, items, timeout)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), now, key, now),
+        )
+        return bool(cursor.rowcount)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        for key in keys:
+            self.validate_key(key)
+        if keys:
+            placeholders = ', '.join('?' * len(keys))
+            self._connection().execute(
+                f'DELETE FROM cache WHERE key IN ({placeholders})', keys
+            )
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._transaction(self._incr, key, delta)
+
+    def _incr(self, connection, key, delta):
+        row = connection.execute(
+            'SELECT value FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Key '{key}' not found")
+        value = pickle.loads(row[0]) + delta
+        connection.execute(
+            'UPDATE cache SET value = ?, accessed = ? WHERE key = ?',
+            (self._dumps(value), time.time(), key),
+        )
+        return value
+
+    def _cull(self, connection):
+        connection.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            (time.time(),),
+        )
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE key IN ('
+            'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (max(count // self._cull_frequency, count - self._max_entries),),
+        )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединение живёт всё время жизни потока и переиспользуется между
+        # запросами, поэтому по окончании запроса его не закрываем.
+        pass
@@ -0,0 +1,166 @@
+"""Нагрузочный тест SQLite: чтение и запись из нескольких процессов.
+
+Каждый профиль работает со своей копией базы. Процессы в цикле читают
+страницу главной ленты или пишут комментарий в транзакции, как
+add_comment: чтение поста, затем запись. В транзакции по умолчанию
+(DEFERRED) такая запись повышает блокировку чтения до записи, и при
+конкурирующем писателе SQLite сразу отвечает «database is locked».
+После каждой операции вызывается close_old_connections — так же, как
+в конце запроса: без CONN_MAX_AGE соединение закрывается и следующая
+операция открывает новое.
+
+Кэш в процессах — LocMemCache, чтобы общий файл кэша не смешивал
+блокировки кэша с блокировками базы.
+"""
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.conf import settings
+
+PROFILES = {
+    # Как было: стандартный бэкенд, PRAGMA по умолчанию, журнал DELETE,
+    # новое соединение на каждый запрос.
+    'plain': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {},
+        'journal_mode': 'DELETE',
+    },
+    # Как в settings.DATABASES.
+    'tuned': None,
+}
+POSTS_ON_PAGE = 10
+
+
+def _profile_settings(name, path):
+    if PROFILES[name] is None:
+        database = dict(settings.DATABASES['default'])
+        journal_mode = 'WAL'
+    else:
+        database = dict(settings.DATABASES['default'], **PROFILES[name])
+        journal_mode = database.pop('journal_mode')
+    database['NAME'] = path
+    return database, journal_mode
+
+
+def _init_worker(database):
+    from django.conf import settings
+    settings.DATABASES['default'] = database
+    # Профиль проверяет только временную копию: реплики из настроек
+    # (файл db.replica.sqlite3) к ней отношения не имеют.
+    settings.DATABASE_ROUTERS = []
+    settings.DATABASE_REPLICAS = []
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+    import django
+    django.setup()
+
+
+def _worker(duration, write_share, seed):
+    from django.db import OperationalError, close_old_connections
+    from django.db import transaction
+    from django.db.models import Max
+
+    from posts import feeds
+    from posts.models import Comment, Post
+    from posts.paginators import CursorPaginator
+
+    rng = random.Random(seed)
+    last_post = Post.objects.aggregate(last=Max('pk'))['last']
+    authors = list(Post.objects.values_list('author_id', flat=True)[:100])
+    close_old_connections()
+    timings = {'read': [], 'write': []}
+    errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        kind = 'write' if rng.random() < write_share else 'read'
+        start = time.perf_counter()
+        try:
+            if kind == 'read':
+                list(CursorPaginator(
+                    feeds.index_feed(), POSTS_ON_PAGE
+                ).page_queryset())
+            else:
+                # Как add_comment: сначала чтение поста, потом запись.
+                with transaction.atomic():
+                    post = Post.objects.filter(
+                        pk__lte=rng.randint(1, last_post)
+                    ).order_by('-pk').first()
+                    Comment.objects.create(
+                        post=post,
+                        author_id=rng.choice(authors),
+                        text='Комментарий нагрузочного теста',
+                    )
+        except OperationalError:
+            errors += 1
+        else:
+            timings[kind].append((time.perf_counter() - start) * 1000)
+        finally:
+            close_old_connections()
+    return timings, errors
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, round(len(ordered) * percent / 100) - 1)]
+
+
+def run_profile(name, source, workers, duration, write_share):
+    """Гоняет нагрузку на копии source. Возвращает сводку профиля."""
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'db.sqlite3')
+        backup(source, path)
+        database, journal_mode = _profile_settings(name, path)
+        connection = sqlite3.connect(path)
+        connection.execute(f'PRAGMA journal_mode = {journal_mode}')
+        connection.close()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(database,),
+        ) as executor:
+            results = list(executor.map(
+                _worker,
+                [duration] * workers,
+                [write_share] * workers,
+                range(workers),
+            ))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    reads = [ms for timings, _ in results for ms in timings['read']]
+    writes = [ms for timings, _ in results for ms in timings['write']]
+    return {
+        'profile': name,
+        'reads_per_second': round(len(reads) / duration, 1),
+        'writes_per_second': round(len(writes) / duration, 1),
+        'errors': sum(errors for _, errors in results),
+        'read_p50_ms': round(statistics.median(reads), 1) if reads else 0,
+        'read_p95_ms': round(_percentile(reads, 95), 1),
+        'write_p50_ms': round(statistics.median(writes), 1) if writes else 0,
+        'write_p95_ms': round(_percentile(writes, 95), 1),
+    }
+
+
+def backup(source, target):
+    """Целостная копия базы средствами SQLite, даже если в неё пишут."""
+    source_connection = sqlite3.connect(source)
+    target_connection = sqlite3.connect(target)
+    try:
+        source_connection.backup(target_connection)
+    finally:
+        target_connection.close()
+        source_connection.close()
@@ -0,0 +1,52 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность чтения и записи SQLite под '
+        'конкурентной нагрузкой со стандартными настройками и с '
+        'настройками из settings.DATABASES. Нагрузка идёт на копии базы; '
+        'наполните её заранее, например командой seed_content.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source', default=settings.DATABASES['default']['NAME'],
+            help='База, копии которой нагружаются.',
+        )
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Длительность нагрузки на профиль, в секундах.',
+        )
+        parser.add_argument(
+            '--write-share', type=float, default=0.2,
+            help='Доля операций записи.',
+        )
+        parser.add_argument(
+            '--profile', action='append', dest='profiles',
+            choices=tuple(loadtest.PROFILES),
+            help='Какие профили сравнивать. По умолчанию — все.',
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['source']):
+            raise CommandError(f'Нет базы {options["source"]}')
+        rows = [
+            loadtest.run_profile(
+                name, options['source'], options['workers'],
+                options['duration'], options['write_share'],
+            )
+            for name in options['profiles'] or loadtest.PROFILES
+        ]
+        columns = list(rows[0])
+        self.stdout.write(' '.join(f'{column:>17}' for column in columns))
+        for row in rows:
+            self.stdout.write(
+                ' '.join(f'{row[column]!s:>17}' for column in columns)
+            )
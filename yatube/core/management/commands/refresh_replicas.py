@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import replicas
+from posts import caching
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу в реплики из settings.DATABASE_REPLICAS '
+        'через backup API SQLite. С --interval обновляет их в цикле.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Обновлять каждые N секунд; 0 — один раз.',
+        )
+
+    def handle(self, *args, **options):
+        if not replicas.replica_aliases():
+            raise CommandError('В settings.DATABASE_REPLICAS нет реплик.')
+        while True:
+            for alias in replicas.replica_aliases():
+                start = time.perf_counter()
+                replicas.refresh(alias)
+                self.stdout.write(
+                    f'{alias}: {time.perf_counter() - start:.2f} с'
+                )
+            # Страницы лент и карточки постов, отрендеренные с отстающей
+            # реплики, лежат в кэше до смены поколения; после обновления
+            # их пора перерендерить. Прочитанное из основной базы
+            # остаётся в кэше.
+            caching.bump(caching.REPLICAS)
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from core import querylog
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит самые тяжёлые запросы из журнала по отпечаткам: '
+        'сколько раз вызваны, сколько времени заняли, какой view их '
+        'выдал и план медленных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Сколько запросов вывести.',
+        )
+        parser.add_argument(
+            '--order-by', choices=tuple(querylog.ORDERINGS),
+            default='total',
+            help='Сортировка: суммарное, максимальное, среднее время или '
+                 'число вызовов.',
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Очистить журнал после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        rows = querylog.top(options['limit'], options['order_by'])
+        if not rows:
+            self.stdout.write('Журнал запросов пуст.')
+        for number, row in enumerate(rows, start=1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{number}. {row["view"] or "вне view"}: '
+                f'{row["calls"]} вызовов, всего {row["total_ms"]:.1f} мс, '
+                f'в среднем {row["total_ms"] / row["calls"]:.1f} мс, '
+                f'максимум {row["max_ms"]:.1f} мс, '
+                f'медленных {row["slow_calls"]}'
+            ))
+            self.stdout.write(row['fingerprint'])
+            if row['plan']:
+                self.stdout.write(self.style.WARNING(row['plan']))
+            self.stdout.write('')
+        if options['reset']:
+            querylog.reset()
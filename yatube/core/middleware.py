@@ -0,0 +1,98 @@
+import random
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from . import profiling, querylog, replicas
+
+UNRESOLVED_VIEW = '<unresolved>'
+
+
+class SamplingProfilerMiddleware:
+    """Профилирует случайную долю запросов (см. core/profiling.py).
+
+    Ставится первым в MIDDLEWARE, чтобы в замер попали остальные
+    middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= profiling.sample_rate():
+            return self.get_response(request)
+        profile = profiling.Profile(request)
+        profiling.activate(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.execute)
+                    )
+                start = time.perf_counter()
+                response = self.get_response(request)
+                profile.total_ms = (time.perf_counter() - start) * 1000
+        finally:
+            profiling.deactivate()
+        match = request.resolver_match
+        profile.view = match.view_name if match else UNRESOLVED_VIEW
+        profile.status = response.status_code
+        profiling.store(profile)
+        return response
+
+
+class QueryLogMiddleware:
+    """Сообщает журналу запросов (core/querylog.py), какой view их выдал."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            querylog.set_view(querylog.NO_VIEW)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        querylog.set_view(request.resolver_match.view_name)
+
+
+class ReplicaPinMiddleware:
+    """Читает из основной базы после собственной записи (core/replicas.py).
+
+    Запись во время запроса закрепляет пользователя на
+    REPLICA_PIN_SECONDS секунд: пока отметка в кэше жива, его запросы с
+    любого устройства не читают с реплик. Анонимному браузеру вместо
+    этого ставится кука. Стоит после AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replicas.unpin()
+        if request.user.is_authenticated:
+            if replicas.user_pinned(request.user.pk):
+                replicas.pin()
+        elif replicas.PIN_COOKIE in request.COOKIES:
+            replicas.pin()
+        try:
+            response = self.get_response(request)
+            if replicas.wrote():
+                self.remember_write(request, response)
+            return response
+        finally:
+            replicas.unpin()
+
+    def remember_write(self, request, response):
+        # View мог войти в аккаунт или выйти из него: важен пользователь
+        # после ответа.
+        if request.user.is_authenticated:
+            replicas.pin_user(request.user.pk)
+            return
+        response.set_cookie(
+            replicas.PIN_COOKIE, '1',
+            max_age=replicas.pin_seconds(),
+            httponly=True, samesite='Lax',
+        )
@@ -0,0 +1,152 @@
+"""Выборочное профилирование запросов, пригодное для продакшена.
+
+Профилируется случайная доля запросов (settings.PROFILER_SAMPLE_RATE),
+остальные проходят без накладных расходов. Для каждого профиля
+записываются время view, число и время SQL-запросов, время рендера
+шаблонов и попадания и промахи кэша.
+
+Профили хранятся в кольцевом буфере в кэше: PROFILER_BUFFER_SIZE ячеек,
+новый профиль затирает самый старый. Кэш общий для всех воркеров,
+поэтому страница профилей видит запросы любого процесса.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.backends.django import Template
+from django.utils import timezone
+
+SAMPLE_RATE = 0.01
+BUFFER_SIZE = 1000
+WORST_PER_VIEW = 10
+CURSOR_KEY = 'profiler:cursor'
+SLOT_KEY = 'profiler:slot:{}'
+# Ключей в одном get_many: у SQLite ограничено число параметров.
+READ_BATCH_SIZE = 500
+
+_local = threading.local()
+
+
+def sample_rate():
+    return getattr(settings, 'PROFILER_SAMPLE_RATE', SAMPLE_RATE)
+
+
+def buffer_size():
+    return getattr(settings, 'PROFILER_BUFFER_SIZE', BUFFER_SIZE)
+
+
+class Profile:
+    def __init__(self, request):
+        self.method = request.method
+        self.path = request.path
+        self.view = None
+        self.status = None
+        self.started = timezone.now()
+        self.total_ms = 0.0
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def execute(self, execute, sql, params, many, context):
+        """Обёртка connection.execute_wrapper: считает SQL-запросы."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_ms += (time.perf_counter() - start) * 1000
+
+    def as_dict(self):
+        return {
+            name: round(value, 2) if isinstance(value, float) else value
+            for name, value in vars(self).items()
+        }
+
+
+def current():
+    """Профиль текущего запроса или None, если запрос не в выборке."""
+    return getattr(_local, 'profile', None)
+
+
+def activate(profile):
+    _local.profile = profile
+
+
+def deactivate():
+    _local.profile = None
+
+
+def record_cache(hits, misses):
+    profile = current()
+    if profile is not None:
+        profile.cache_hits += hits
+        profile.cache_misses += misses
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        profile = current()
+        if profile is None:
+            return render(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            profile.template_ms += (time.perf_counter() - start) * 1000
+    wrapper.profiled = True
+    return wrapper
+
+
+def install():
+    """Подключает замер рендера шаблонов.
+
+    Оборачивается рендер шаблона бэкенда: его вызывают render() и
+    TemplateResponse для страницы целиком, а {% include %} рендерится
+    внутри, поэтому вложенные шаблоны не считаются дважды.
+    """
+    if not getattr(Template.render, 'profiled', False):
+        Template.render = _timed_render(Template.render)
+
+
+def _next_slot():
+    try:
+        return cache.incr(CURSOR_KEY)
+    except ValueError:
+        cache.add(CURSOR_KEY, 0, None)
+        return cache.incr(CURSOR_KEY)
+
+
+def store(profile):
+    """Кладёт профиль в кольцевой буфер на место самого старого."""
+    slot = _next_slot() % buffer_size()
+    cache.set(SLOT_KEY.format(slot), profile.as_dict(), None)
+
+
+def stored_profiles():
+    keys = [SLOT_KEY.format(slot) for slot in range(buffer_size())]
+    profiles = []
+    for start in range(0, len(keys), READ_BATCH_SIZE):
+        profiles.extend(
+            cache.get_many(keys[start:start + READ_BATCH_SIZE]).values()
+        )
+    return profiles
+
+
+def worst_by_view(limit=WORST_PER_VIEW):
+    """Самые медленные профили каждого view.
+
+    Список (view, число профилей, худшие профили), самые медленные view
+    первыми.
+    """
+    views = {}
+    for profile in stored_profiles():
+        views.setdefault(profile['view'], []).append(profile)
+    result = []
+    for view, profiles in views.items():
+        profiles.sort(key=lambda profile: profile['total_ms'], reverse=True)
+        result.append((view, len(profiles), profiles[:limit]))
+    result.sort(key=lambda row: row[2][0]['total_ms'], reverse=True)
+    return result
@@ -0,0 +1,226 @@
+"""Журнал медленных запросов с группировкой по отпечаткам.
+
+Каждый SQL-запрос приводится к отпечатку: литералы и параметры
+заменяются на ?, списки IN (...) и многострочные VALUES сворачиваются.
+Запросы с одним отпечатком — один и тот же запрос ORM с разными
+данными. По паре (отпечаток, view) копятся число вызовов, суммарное и
+максимальное время; для запроса дольше settings.QUERYLOG_SLOW_MS
+сохраняется план EXPLAIN QUERY PLAN.
+
+Счётчики копятся в памяти процесса и сбрасываются в отдельный файл
+SQLite (settings.QUERYLOG_PATH) в конце запроса, не чаще раза в
+FLUSH_INTERVAL секунд. Запись — UPSERT со сложением, поэтому воркеры не
+затирают данные друг друга. Команда slow_queries выводит худшие запросы.
+"""
+import atexit
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from hashlib import md5
+
+from django.conf import settings
+from django.db import DatabaseError
+
+SLOW_MS = 100
+FLUSH_INTERVAL = 5.0
+BUSY_TIMEOUT = 5.0
+NO_VIEW = ''
+EXPLAINABLE = re.compile(r'\s*(SELECT|WITH)\b', re.I)
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS querylog ('
+    'digest TEXT NOT NULL, view TEXT NOT NULL, fingerprint TEXT NOT NULL, '
+    'calls INTEGER NOT NULL, total_ms REAL NOT NULL, max_ms REAL NOT NULL, '
+    'slow_calls INTEGER NOT NULL, plan TEXT, '
+    'PRIMARY KEY (digest, view))'
+)
+UPSERT_SQL = (
+    'INSERT INTO querylog (digest, view, fingerprint, calls, total_ms, '
+    'max_ms, slow_calls, plan) VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+    'ON CONFLICT (digest, view) DO UPDATE SET '
+    'calls = calls + excluded.calls, '
+    'total_ms = total_ms + excluded.total_ms, '
+    'max_ms = MAX(max_ms, excluded.max_ms), '
+    'slow_calls = slow_calls + excluded.slow_calls, '
+    'plan = COALESCE(excluded.plan, plan)'
+)
+ORDERINGS = {
+    'total': 'total_ms',
+    'max': 'max_ms',
+    'calls': 'calls',
+    'avg': 'total_ms / calls',
+}
+NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s|\?'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'(VALUES\s*\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+', re.I), r'\1'),
+    (re.compile(r'\s+'), ' '),
+)
+
+_local = threading.local()
+_lock = threading.Lock()
+_pending = {}
+_last_flush = time.monotonic()
+
+
+def slow_ms():
+    return getattr(settings, 'QUERYLOG_SLOW_MS', SLOW_MS)
+
+
+def log_path():
+    return getattr(
+        settings, 'QUERYLOG_PATH',
+        os.path.join(settings.BASE_DIR, 'querylog.sqlite3'),
+    )
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    for pattern, replacement in NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def set_view(view):
+    _local.view = view
+
+
+def current_view():
+    return getattr(_local, 'view', NO_VIEW)
+
+
+def _explain(connection, sql, params):
+    """План запроса; None, если бэкенд его не дал.
+
+    Планы снимаются только с SELECT: EXPLAIN для DDL (например, долгого
+    CREATE INDEX в миграции) заново разбирает уже выполненную команду.
+    """
+    if not EXPLAINABLE.match(sql):
+        return None
+    prefix = (
+        'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    )
+    # Сырой курсор бэкенда: обёртки execute_wrapper его не видят, а
+    # результаты исходного запроса на его курсоре не затираются.
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(prefix + sql, params)
+        rows = cursor.fetchall()
+    except (DatabaseError, connection.Database.Error):
+        # Сырой курсор бросает исключения драйвера, а не Django.
+        return None
+    finally:
+        cursor.close()
+    return '\n'.join(' '.join(str(part) for part in row) for row in rows)
+
+
+def wrapper(execute, sql, params, many, context):
+    """execute_wrapper: копит время запроса под его отпечатком."""
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        key = (fingerprint(sql), current_view())
+        slow = elapsed >= slow_ms()
+        plan = None
+        # План снимается раз на отпечаток между сбросами журнала.
+        if slow and not many and not _has_plan(key):
+            plan = _explain(context['connection'], sql, params)
+        _record(key, elapsed, slow, plan)
+
+
+def _has_plan(key):
+    stats = _pending.get(key)
+    return stats is not None and stats[4] is not None
+
+
+def _record(key, elapsed, slow, plan):
+    with _lock:
+        stats = _pending.get(key)
+        if stats is None:
+            # calls, total_ms, max_ms, slow_calls, plan
+            stats = _pending[key] = [0, 0.0, 0.0, 0, None]
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] = max(stats[2], elapsed)
+        stats[3] += slow
+        if plan is not None:
+            stats[4] = plan
+
+
+def install(connection, **kwargs):
+    """Обработчик connection_created: подключает wrapper к соединению."""
+    if wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(wrapper)
+
+
+def _connect():
+    path = log_path()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute(SCHEMA)
+    return connection
+
+
+def flush(force=False, **kwargs):
+    """Сбрасывает накопленное в файл журнала.
+
+    Подключён к request_finished; без force — не чаще FLUSH_INTERVAL.
+    """
+    global _last_flush
+    if not force and time.monotonic() - _last_flush < FLUSH_INTERVAL:
+        return
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return
+    rows = [
+        (md5(sql.encode()).hexdigest(), view, sql, *stats)
+        for (sql, view), stats in pending.items()
+    ]
+    connection = _connect()
+    try:
+        with connection:
+            connection.executemany(UPSERT_SQL, rows)
+    finally:
+        connection.close()
+
+
+atexit.register(flush, force=True)
+
+
+def top(limit=20, order_by='total'):
+    """Худшие запросы: словари с полями таблицы querylog."""
+    flush(force=True)
+    connection = _connect()
+    connection.row_factory = sqlite3.Row
+    try:
+        rows = connection.execute(
+            f'SELECT * FROM querylog ORDER BY {ORDERINGS[order_by]} DESC '
+            f'LIMIT ?',
+            (limit,),
+        ).fetchall()
+    finally:
+        connection.close()
+    return [dict(row) for row in rows]
+
+
+def reset():
+    with _lock:
+        _pending.clear()
+    connection = _connect()
+    try:
+        with connection:
+            connection.execute('DELETE FROM querylog')
+    finally:
+        connection.close()
@@ -0,0 +1,134 @@
+"""Чтение лент с реплик базы.
+
+Реплика — копия основной базы (settings.DATABASE_REPLICAS — её алиасы в
+DATABASES), которую команда refresh_replicas обновляет через backup API
+SQLite. ReplicaRouter отправляет на реплики чтение моделей из
+REPLICATED_APPS: ленты, посты, комментарии. Всё остальное, в том числе
+пользователи и сессии, читается из основной базы, а запись идёт только
+в неё.
+
+Реплика отстаёт от основной базы до следующего обновления, поэтому
+после собственной записи пользователь читает основную базу
+settings.REPLICA_PIN_SECONDS секунд. ReplicaPinMiddleware запоминает
+это в общем кэше по id пользователя (PIN_KEY), так что закреплены все
+его устройства; анонимному браузеру ставится кука PIN_COOKIE. Окно
+должно быть не короче интервала обновления реплик. Внутри транзакции
+чтение тоже идёт в основную базу, чтобы транзакция видела собственные
+изменения.
+"""
+import os
+import random
+import sqlite3
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICATED_APPS = {'posts'}
+PIN_SECONDS = 60
+PIN_COOKIE = 'replica_pin'
+PIN_KEY = 'replica_pin:{}'
+BUSY_TIMEOUT = 30.0
+
+_local = threading.local()
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', PIN_SECONDS)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+def available(alias):
+    """Реплика готова, если её файл уже создан refresh_replicas.
+
+    Для тестовой базы в памяти (TEST MIRROR) файла нет, и чтение
+    остаётся в основной базе.
+    """
+    return os.path.isfile(connections[alias].settings_dict['NAME'])
+
+
+def pin(wrote=False):
+    _local.pinned = True
+    if wrote:
+        _local.wrote = True
+
+
+def unpin():
+    _local.pinned = False
+    _local.wrote = False
+
+
+def pin_user(user_id):
+    """Закрепляет чтение пользователя за основной базой на всех устройствах."""
+    cache.set(PIN_KEY.format(user_id), True, pin_seconds())
+
+
+def user_pinned(user_id):
+    return cache.get(PIN_KEY.format(user_id), False)
+
+
+def pinned():
+    return getattr(_local, 'pinned', False)
+
+
+def wrote():
+    """Была ли запись в основную базу с последнего unpin()."""
+    return getattr(_local, 'wrote', False)
+
+
+def read_alias(model):
+    """Реплика, с которой сейчас читается model, или None — основная база."""
+    if (
+        model._meta.app_label not in REPLICATED_APPS
+        or pinned()
+        or connections[DEFAULT_DB_ALIAS].in_atomic_block
+    ):
+        return None
+    aliases = [alias for alias in replica_aliases() if available(alias)]
+    return random.choice(aliases) if aliases else None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias(model)
+
+    def db_for_write(self, model, **hints):
+        pin(wrote=True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Объект, прочитанный с реплики, — та же строка основной базы.
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема реплики приезжает вместе с данными.
+        if db in replica_aliases():
+            return False
+        return None
+
+
+def refresh(alias):
+    """Копирует основную базу в реплику alias.
+
+    Файл реплики перезаписывается на месте, а не подменяется: воркеры
+    держат соединения с ним открытыми (CONN_MAX_AGE) и после копирования
+    читают новые данные. Пока идёт копирование, их чтение ждёт
+    блокировку, как при обычной записи.
+    """
+    source = connections[DEFAULT_DB_ALIAS]
+    source.ensure_connection()
+    target = sqlite3.connect(
+        connections[alias].settings_dict['NAME'], timeout=BUSY_TIMEOUT
+    )
+    try:
+        with source.wrap_database_errors:
+            source.connection.backup(target)
+    finally:
+        target.close()
@@ -0,0 +1,64 @@
+"""Хранилище загрузок с именами по содержимому.
+
+Файл называется по SHA-256 своего содержимого и кладётся в подкаталоги
+по первым символам хэша: posts/3a/7f/3a7f…e1.gif. Одинаковые загрузки
+хранятся один раз, а в каталоге не скапливаются десятки тысяч файлов.
+Содержимое по такому адресу никогда не меняется, поэтому его можно
+отдавать с заголовком Cache-Control: immutable (см. core.views.media).
+"""
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CHUNK_SIZE = 64 * 1024
+SHARD_DEPTH = 2
+SHARD_WIDTH = 2
+HASHED_NAME_RE = re.compile(
+    r'(?:^|/)' + r'[0-9a-f]{%d}/' % SHARD_WIDTH * SHARD_DEPTH
+    + r'[0-9a-f]{64}(?:\.\w+)?$'
+)
+
+
+def content_hash(content):
+    """SHA-256 файла, прочитанного кусками, без загрузки в память."""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def is_hashed_name(name):
+    return HASHED_NAME_RE.search(name) is not None
+
+
+@deconstructible
+class HashedFileSystemStorage(FileSystemStorage):
+    def hashed_name(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        digest = content_hash(content)
+        shards = [
+            digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH]
+            for i in range(SHARD_DEPTH)
+        ]
+        return '/'.join(
+            part for part in (directory, *shards, digest + extension) if part
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
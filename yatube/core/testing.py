@@ -0,0 +1,46 @@
+"""Окружение тестов, отделённое от файлов dev-сервера.
+
+Кэш (core.cache_backends.SQLiteCache) и журнал запросов лежат в файлах
+рядом с базой. Тесты вызывают cache.clear() и сбрасывают журнал, поэтому
+на время тестов эти файлы переносятся во временный каталог.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+from . import querylog
+
+
+def isolated_settings(directory):
+    """override_settings: файлы кэша и журнала запросов в directory."""
+    caches = {}
+    for alias, config in settings.CACHES.items():
+        config = dict(config)
+        if config.get('LOCATION', '').endswith('.sqlite3'):
+            config['LOCATION'] = os.path.join(
+                directory, os.path.basename(config['LOCATION'])
+            )
+        caches[alias] = config
+    return override_settings(
+        CACHES=caches,
+        QUERYLOG_PATH=os.path.join(directory, 'querylog.sqlite3'),
+    )
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.files_directory = tempfile.mkdtemp()
+        self.isolated = isolated_settings(self.files_directory)
+        self.isolated.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        # Иначе накопленное сбросится при выходе в настоящий журнал.
+        querylog.flush(force=True)
+        self.isolated.disable()
+        shutil.rmtree(self.files_directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
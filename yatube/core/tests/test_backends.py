@@ -0,0 +1,78 @@
+import shutil
+import sqlite3
+import tempfile
+from os import path
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from ..backends.sqlite3.base import DatabaseWrapper
+
+TEMP_DIR = tempfile.mkdtemp()
+
+
+def wrapper(**options):
+    return DatabaseWrapper({
+        'NAME': path.join(TEMP_DIR, 'db.sqlite3'),
+        'OPTIONS': options,
+        'TIME_ZONE': None,
+        'CONN_MAX_AGE': 0,
+        'AUTOCOMMIT': True,
+        'ATOMIC_REQUESTS': False,
+    })
+
+
+class TunedSQLiteBackendTest(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def pragma(self, connection, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_default_pragmas_are_applied_to_new_connections(self):
+        connection = wrapper()
+        try:
+            self.assertEqual(self.pragma(connection, 'journal_mode'), 'wal')
+            # NORMAL = 1.
+            self.assertEqual(self.pragma(connection, 'synchronous'), 1)
+            self.assertEqual(self.pragma(connection, 'busy_timeout'), 5000)
+            self.assertEqual(self.pragma(connection, 'cache_size'), -65536)
+        finally:
+            connection.close()
+
+    def test_options_override_and_disable_defaults(self):
+        connection = wrapper(pragmas={'busy_timeout': 100, 'mmap_size': None})
+        try:
+            self.assertEqual(self.pragma(connection, 'busy_timeout'), 100)
+            self.assertNotIn('mmap_size', connection.pragmas)
+        finally:
+            connection.close()
+
+    def test_invalid_options_are_rejected(self):
+        for options in (
+            {'pragmas': {'journal_mode': 'WAL; DROP TABLE posts_post'}},
+            {'transaction_mode': 'LATER'},
+        ):
+            with self.subTest(options=options):
+                with self.assertRaises(ImproperlyConfigured):
+                    wrapper(**options).ensure_connection()
+
+    def test_transaction_takes_write_lock_at_start(self):
+        connection = wrapper()
+        other = sqlite3.connect(connection.settings_dict['NAME'], timeout=0)
+        try:
+            connection.ensure_connection()
+            # Так транзакцию на SQLite открывает transaction.atomic().
+            connection._start_transaction_under_autocommit()
+            with self.assertRaisesMessage(
+                sqlite3.OperationalError, 'database is locked'
+            ):
+                other.execute('BEGIN IMMEDIATE')
+            connection.connection.rollback()
+        finally:
+            other.close()
+            connection.close()
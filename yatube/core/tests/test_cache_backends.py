@@ -0,0 +1,94 @@
+import multiprocessing
+import shutil
+import tempfile
+import time
+from os import path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from ..cache_backends import SQLiteCache
+
+
+def _increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = path.join(self.directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(
+            self.location, {'OPTIONS': {'MAX_ENTRIES': 10}}
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_basic_operations(self):
+        """Кэш поддерживает стандартный интерфейс Django."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('new', 'value'))
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2}
+        )
+        self.cache.delete('a')
+        self.assertFalse(self.cache.has_key('a'))
+        self.assertEqual(self.cache.incr('b', 5), 7)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_cache_is_shared_between_instances(self):
+        """Запись одного экземпляра видна другому с тем же файлом."""
+        self.cache.set('key', 'value')
+        other = SQLiteCache(self.location, {})
+        self.assertEqual(other.get('key'), 'value')
+
+    def test_expired_entries_are_not_returned(self):
+        self.cache.set('key', 'value', timeout=0.05)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_least_recently_used_entries_are_culled(self):
+        """При переполнении вытесняются давно не читанные ключи."""
+        self.cache.set('hot', 'value')
+        for i in range(9):
+            self.cache.set(f'cold{i}', i)
+        time.sleep(1.1)
+        self.cache.get('hot')
+        self.cache.set('overflow', 'value')
+        self.assertEqual(self.cache.get('hot'), 'value')
+        self.assertIsNone(self.cache.get('cold0'))
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_increment, args=(self.location, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+
+class TestCacheLocationTest(SimpleTestCase):
+    def test_tests_do_not_share_dev_server_cache(self):
+        """Тесты пишут кэш не в файл dev-сервера."""
+        self.assertNotEqual(
+            path.dirname(settings.CACHES['default']['LOCATION']),
+            settings.BASE_DIR,
+        )
+        self.assertTrue(
+            caches['default']._path.startswith(tempfile.gettempdir())
+        )
@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import profiling
+
+User = get_user_model()
+
+
+class SamplingProfilerTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(PROFILER_SAMPLE_RATE=1)
+    def test_sampled_request_is_profiled(self):
+        self.client.get(reverse('posts:index'))
+        [profile] = profiling.stored_profiles()
+        self.assertEqual(profile['view'], 'posts:index')
+        self.assertEqual(profile['status'], 200)
+        self.assertGreater(profile['sql_count'], 0)
+        self.assertGreater(profile['template_ms'], 0)
+        self.assertGreater(profile['cache_misses'], 0)
+        self.assertGreaterEqual(
+            profile['total_ms'], profile['sql_ms'] + profile['template_ms']
+        )
+
+    @override_settings(PROFILER_SAMPLE_RATE=0)
+    def test_requests_outside_sample_are_not_profiled(self):
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(profiling.stored_profiles(), [])
+
+    @override_settings(PROFILER_SAMPLE_RATE=1, PROFILER_BUFFER_SIZE=3)
+    def test_buffer_keeps_latest_profiles(self):
+        paths = [f'/missing-{number}/' for number in range(5)]
+        for path in paths:
+            self.client.get(path)
+        self.assertEqual(
+            sorted(profile['path'] for profile in profiling.stored_profiles()),
+            paths[2:],
+        )
+
+    def test_profiles_page_is_for_staff_only(self):
+        url = reverse('profiles')
+        with override_settings(PROFILER_SAMPLE_RATE=1):
+            self.client.get(reverse('posts:index'))
+        user = User.objects.create_user(username='user')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(url)
+        self.assertContains(response, 'posts:index')
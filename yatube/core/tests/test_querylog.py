@@ -0,0 +1,83 @@
+import shutil
+import tempfile
+from io import StringIO
+from os import path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import querylog
+
+TEMP_DIR = tempfile.mkdtemp()
+
+
+@override_settings(QUERYLOG_PATH=path.join(TEMP_DIR, 'querylog.sqlite3'))
+class QueryLogTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        querylog.reset()
+
+    def test_fingerprint_ignores_literals_and_list_lengths(self):
+        self.assertEqual(
+            querylog.fingerprint(
+                "SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x'"
+            ),
+            querylog.fingerprint(
+                "SELECT * FROM  t WHERE id IN (%s) AND name = 'it''s'"
+            ),
+        )
+        self.assertEqual(
+            querylog.fingerprint('INSERT INTO t VALUES (1, 2), (3, 4)'),
+            'INSERT INTO t VALUES (...)',
+        )
+
+    def test_queries_are_aggregated_per_view(self):
+        for number in range(3):
+            list(Post.objects.filter(pk=number))
+        self.client.get(reverse('posts:index'))
+        rows = querylog.top(limit=100, order_by='calls')
+        [orm] = [
+            row for row in rows
+            if row['view'] == querylog.NO_VIEW
+            and row['fingerprint'].startswith('SELECT')
+            and '"posts_post"."id" = ?' in row['fingerprint']
+        ]
+        self.assertEqual(orm['calls'], 3)
+        self.assertIn('posts:index', {row['view'] for row in rows})
+
+    @override_settings(QUERYLOG_SLOW_MS=0)
+    def test_slow_query_plan_is_captured(self):
+        list(Post.objects.filter(author__username='author'))
+        plans = [row['plan'] for row in querylog.top(limit=100)]
+        self.assertTrue(any(plan and 'posts_post' in plan for plan in plans))
+
+    @override_settings(QUERYLOG_SLOW_MS=0)
+    def test_slow_ddl_is_logged_without_plan(self):
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE INDEX querylog_test ON posts_post (text)')
+            cursor.execute('DROP INDEX querylog_test')
+        rows = [
+            row for row in querylog.top(limit=100)
+            if 'querylog_test' in row['fingerprint']
+        ]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual({row['plan'] for row in rows}, {None})
+
+    @override_settings(QUERYLOG_SLOW_MS=0)
+    def test_slow_queries_command(self):
+        self.client.get(reverse('posts:index'))
+        stdout = StringIO()
+        call_command('slow_queries', limit=5, reset=True, stdout=stdout)
+        self.assertIn('posts:index', stdout.getvalue())
+        self.assertIn('SCAN', stdout.getvalue())
+        self.assertEqual(querylog.top(), [])
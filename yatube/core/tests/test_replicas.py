@@ -0,0 +1,132 @@
+import shutil
+import tempfile
+from io import StringIO
+from os import path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts import caching
+from posts.models import Post
+from posts.templatetags.post_cards import card_cache_key
+
+from .. import replicas
+
+User = get_user_model()
+TEMP_DIR = tempfile.mkdtemp()
+
+
+@override_settings(REPLICA_PIN_SECONDS=30)
+class ReplicaRoutingTest(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.old_post = Post.objects.create(
+            author=self.author, text='Пост, который есть на реплике'
+        )
+        replica = connections['replica']
+        self.addCleanup(
+            replica.settings_dict.__setitem__, 'NAME',
+            replica.settings_dict['NAME'],
+        )
+        self.addCleanup(replica.close)
+        replica.close()
+        replica.settings_dict['NAME'] = path.join(TEMP_DIR, 'replica.sqlite3')
+        replicas.refresh('replica')
+        self.new_post = Post.objects.create(
+            author=self.author, text='Пост, которого на реплике ещё нет'
+        )
+        self.author_client = self.client_class()
+        self.author_client.force_login(self.author)
+
+    def index_posts(self, client):
+        response = client.get(reverse('posts:index'))
+        return set(response.context['page_obj'])
+
+    def test_feed_reads_go_to_replica(self):
+        self.assertEqual(self.index_posts(self.client), {self.old_post})
+
+    def test_only_posts_reads_outside_transactions_use_replica(self):
+        router = replicas.ReplicaRouter()
+        replicas.unpin()
+        self.assertEqual(router.db_for_read(Post), 'replica')
+        self.assertIsNone(router.db_for_read(User))
+        with transaction.atomic():
+            self.assertIsNone(router.db_for_read(Post))
+
+    def test_own_write_pins_user_reads_to_primary(self):
+        """После записи основная база читается со всех устройств."""
+        response = self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'}
+        )
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+        other_device = self.client_class()
+        other_device.force_login(self.author)
+        self.assertEqual(
+            {post.text for post in self.index_posts(other_device)},
+            {self.old_post.text, self.new_post.text, 'Свежий пост'},
+        )
+        self.assertEqual(self.index_posts(self.client), {self.old_post})
+
+    def test_anonymous_write_pins_browser(self):
+        response = self.client.post(reverse('users:signup'), {
+            'username': 'newcomer',
+            'password1': 'Sup3r-secret!',
+            'password2': 'Sup3r-secret!',
+        })
+        self.assertEqual(
+            response.cookies[replicas.PIN_COOKIE]['max-age'], 30
+        )
+
+    def test_reads_without_writes_do_not_pin(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_refresh_replicas_copies_primary(self):
+        call_command('refresh_replicas', stdout=StringIO())
+        self.assertEqual(
+            self.index_posts(self.client), {self.old_post, self.new_post}
+        )
+
+    def test_cards_read_from_replica_expire_on_refresh(self):
+        self.old_post.text = 'Исправленный пост'
+        self.old_post.save()
+        self.assertContains(
+            self.client.get(reverse('posts:index')), 'который есть на реплике'
+        )
+        replicas.pin_user(self.author.pk)
+        self.assertContains(
+            self.author_client.get(reverse('posts:index')),
+            'Исправленный пост',
+        )
+        call_command('refresh_replicas', stdout=StringIO())
+        self.assertContains(
+            self.client.get(reverse('posts:index')), 'Исправленный пост'
+        )
+
+    def test_refresh_keeps_pages_read_from_primary(self):
+        post = Post.objects.using('default').get(pk=self.old_post.pk)
+        card_key = card_cache_key(post, True, True)
+        site = caching.generation(caching.SITE)
+        replicas.pin_user(self.author.pk)
+        etag = self.author_client.get(reverse('posts:index'))['ETag']
+
+        call_command('refresh_replicas', stdout=StringIO())
+
+        self.assertEqual(card_cache_key(post, True, True), card_key)
+        self.assertEqual(caching.generation(caching.SITE), site)
+        response = self.author_client.get(
+            reverse('posts:index'), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
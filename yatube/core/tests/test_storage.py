@@ -0,0 +1,53 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ..storage import HashedFileSystemStorage
+from ..views import media
+
+
+class HashedFileSystemStorageTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.storage = HashedFileSystemStorage(location=self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_name_is_sharded_content_hash(self):
+        digest = hashlib.sha256(b'content').hexdigest()
+        name = self.storage.save('posts/Photo.JPG', ContentFile(b'content'))
+        self.assertEqual(
+            name, f'posts/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+        )
+        self.assertTrue(self.storage.exists(name))
+
+    def test_identical_uploads_are_stored_once(self):
+        first = self.storage.save('posts/a.gif', ContentFile(b'same'))
+        second = self.storage.save('posts/b.gif', ContentFile(b'same'))
+        other = self.storage.save('posts/c.gif', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        files = [
+            filename
+            for _, _, filenames in os.walk(self.directory)
+            for filename in filenames
+        ]
+        self.assertEqual(len(files), 2)
+
+    def test_media_view_marks_hashed_files_immutable(self):
+        hashed = self.storage.save('posts/a.gif', ContentFile(b'gif'))
+        plain = 'posts/plain.gif'
+        with open(os.path.join(self.directory, plain), 'wb') as file:
+            file.write(b'gif')
+        request = RequestFactory().get('/media/')
+        with override_settings(MEDIA_ROOT=self.directory):
+            hashed_response = media(request, hashed)
+            plain_response = media(request, plain)
+        self.assertIn('immutable', hashed_response['Cache-Control'])
+        self.assertIn('max-age=31536000', hashed_response['Cache-Control'])
+        self.assertFalse(plain_response.has_header('Cache-Control'))
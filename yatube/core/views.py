@@ -1,4 +1,14 @@
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+
+from . import profiling
+from .storage import is_hashed_name
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
 
 
 def page_not_found(request, exception):
@@ -20,3 +30,26 @@ def permission_denied(request, exception):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def media(request, path):
+    """Отдаёт загрузки; файлы с именем по хэшу кэшируются навсегда."""
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if response.status_code == 200 and is_hashed_name(path):
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    return response
+
+
+@staff_member_required
+def profiles(request):
+    """Самые медленные из выборочно профилированных запросов по view."""
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Профили запросов',
+        'views': profiling.worst_by_view(),
+        'sample_rate': profiling.sample_rate(),
+        'buffer_size': profiling.buffer_size(),
+    }
+    return render(request, 'core/profiles.html', context)
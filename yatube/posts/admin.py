@@ -1,15 +1,109 @@
+from functools import partial
+from itertools import chain
+
+from django import forms
 from django.contrib import admin
+from django.http import StreamingHttpResponse
+
+from . import exporter, search
+from .models import Comment, Follow, Group, Post
+from .paginators import EstimatedCountPaginator
+
+
+def export_action(data_format, records):
+    """Действие админки: выгрузка выбранных объектов потоковым ответом.
 
-from .models import Group, Post
+    records получает queryset выбранных объектов и возвращает записи.
+    """
+    def action(modeladmin, request, queryset):
+        response = StreamingHttpResponse(
+            exporter.lines(records(queryset), data_format),
+            content_type=exporter.CONTENT_TYPES[data_format],
+        )
+        filename = f'{queryset.model._meta.model_name}.{data_format}'
+        response['Content-Disposition'] = (
+            f'attachment; filename="{filename}"'
+        )
+        return response
+
+    action.__name__ = f'export_{data_format}'
+    action.short_description = f'Выгрузить в {data_format.upper()}'
+    return action
+
+
+def post_and_comment_records(queryset):
+    return chain(
+        exporter.post_records(queryset),
+        exporter.comment_records(
+            Comment.objects.filter(post__in=queryset.values('pk'))
+        ),
+    )
 
 
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    # Paginator требует упорядоченный список; порядок по pk берётся
+    # из первичного ключа без сортировки.
+    ordering = ('-pk',)
+    autocomplete_fields = ('author', 'group')
     empty_value_display = '-пусто-'
     list_editable = ('group',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = [
+        export_action(data_format, post_and_comment_records)
+        for data_format in exporter.FORMATS
+    ]
+
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по индексу FTS5 вместо LIKE по всей таблице."""
+        if not search_term.strip():
+            return queryset, False
+        return search.matching(queryset, search_term), False
+
+    def get_changelist_formset(self, request, **kwargs):
+        kwargs['formfield_callback'] = partial(
+            self.changelist_formfield, request=request
+        )
+        return super().get_changelist_formset(request, **kwargs)
+
+    def changelist_formfield(self, db_field, request, **kwargs):
+        """Поле группы в строках списка: один список групп на страницу.
+
+        Автокомплит в каждой строке запрашивал бы выбранную группу
+        отдельно, а обычный select — весь список групп на каждую строку.
+        """
+        if db_field.name != 'group':
+            return self.formfield_for_dbfield(db_field, request, **kwargs)
+        formfield = self.formfield_for_foreignkey(
+            db_field, request, widget=forms.Select, **kwargs
+        )
+        formfield.choices = list(formfield.choices)
+        return formfield
+
+
+class GroupAdmin(admin.ModelAdmin):
+    search_fields = ('title', 'slug')
+    actions = [
+        export_action(data_format, exporter.group_records)
+        for data_format in exporter.FORMATS
+    ]
+
+
+class FollowAdmin(admin.ModelAdmin):
+    list_display = ('user', 'author')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    actions = [
+        export_action(data_format, exporter.follow_records)
+        for data_format in exporter.FORMATS
+    ]
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Follow, FollowAdmin)
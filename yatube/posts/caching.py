@@ -0,0 +1,241 @@
+"""Кэш лент с ключами по поколениям.
+
+У каждой ленты есть поколение — случайный токен в кэше. Он входит в
+префикс ключа закэшированной страницы, поэтому запись, меняющая ленту,
+просто выдаёт новый токен, и старые страницы больше не читаются. Так
+страницы можно держать в кэше часами и не показывать устаревшие данные.
+
+Те же поколения служат ETag для условных GET: если поколение не
+сменилось, браузер получает 304 без рендера и без чтения страницы из
+кэша.
+"""
+from calendar import timegm
+from functools import partial, wraps
+from hashlib import md5
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, quote_etag
+)
+from django.utils.http import http_date
+from django.views.decorators.cache import cache_page
+
+from core import replicas
+
+from .models import Follow, Group, Post
+
+User = get_user_model()
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+BATCH_SIZE = 1000
+
+# Поколение всех лент сразу: меняется при правке групп, которые
+# выводятся в карточках любой ленты.
+SITE = ('site',)
+INDEX = ('index',)
+# Меняется при каждом обновлении реплик (refresh_replicas). От него
+# зависят только страницы и карточки, прочитанные с реплики.
+REPLICAS = ('replicas',)
+
+
+def group_key(slug):
+    return ('group', slug)
+
+
+def author_key(username):
+    return ('author', username)
+
+
+def follow_key(user_id):
+    return ('follow', user_id)
+
+
+def author_posts_key(author_id):
+    return ('author-posts', author_id)
+
+
+def follow_keys(user_id):
+    """Ключи ленты подписок: подписки читателя и посты каждого автора.
+
+    Новый пост или комментарий меняет поколение только своего автора, а
+    не лент всех его подписчиков: читатель сам собирает поколения тех,
+    на кого подписан.
+    """
+    return [follow_key(user_id)] + [
+        author_posts_key(author_id) for author_id in Follow.objects.filter(
+            user_id=user_id
+        ).values_list('author_id', flat=True)
+    ]
+
+
+def post_key(post_id):
+    return ('post', post_id)
+
+
+def user_key(user_id):
+    return ('user', user_id)
+
+
+def group_id_key(group_id):
+    return ('group-id', group_id)
+
+
+def _cache_key(key):
+    return 'generation:' + ':'.join(str(part) for part in key)
+
+
+def generation(*keys):
+    """Текущий токен для набора лент; недостающие поколения создаются."""
+    cache_keys = [_cache_key(key) for key in keys]
+    tokens = {}
+    for start in range(0, len(cache_keys), BATCH_SIZE):
+        tokens.update(cache.get_many(cache_keys[start:start + BATCH_SIZE]))
+    missing = [
+        cache_key for cache_key in cache_keys if cache_key not in tokens
+    ]
+    for start in range(0, len(missing), BATCH_SIZE):
+        batch = {
+            cache_key: uuid4().hex
+            for cache_key in missing[start:start + BATCH_SIZE]
+        }
+        cache.set_many(batch, None)
+        tokens.update(batch)
+    return '.'.join(tokens[cache_key] for cache_key in cache_keys)
+
+
+def bump(*keys):
+    """Выдаёт лентам новые поколения, сбрасывая их закэшированные страницы."""
+    keys = list(keys)
+    for start in range(0, len(keys), BATCH_SIZE):
+        cache.set_many(
+            {
+                _cache_key(key): uuid4().hex
+                for key in keys[start:start + BATCH_SIZE]
+            },
+            None,
+        )
+
+
+def invalidate_post(post, group_ids=()):
+    """Сбрасывает все ленты, в которых выводится пост."""
+    group_ids = {post.group_id, *group_ids} - {None}
+    keys = [INDEX, post_key(post.pk), author_posts_key(post.author_id)]
+    keys.extend(
+        group_key(slug) for slug in Group.objects.filter(
+            pk__in=group_ids
+        ).values_list('slug', flat=True)
+    )
+    keys.extend(
+        author_key(username) for username in User.objects.filter(
+            pk=post.author_id
+        ).values_list('username', flat=True)
+    )
+    bump(*keys)
+
+
+def _source_keys():
+    """SITE и, если ленты сейчас читаются с реплики, её поколение."""
+    if replicas.read_alias(Post) is None:
+        return [SITE]
+    return [SITE, REPLICAS]
+
+
+def _viewer_token(request, token, csrf=False):
+    # Страница зависит и от того, кто её смотрит: шапка, кнопки подписки.
+    # В формы ещё и вписан CSRF-токен, а login() его меняет: без него
+    # в ETag после повторного входа браузер отправил бы старую форму.
+    if csrf:
+        # get_token() заводит токен, если куки ещё нет: тогда ETag первого
+        # ответа совпадёт с ETag следующего запроса, уже с кукой.
+        get_token(request)
+        token = f'{request.META["CSRF_COOKIE"]}.{token}'
+    return f'{request.user.pk or 0}.{token}'
+
+
+def _conditional(request, token, last_modified=None):
+    """304, если у клиента актуальная версия, иначе None и заголовки."""
+    headers = {'ETag': quote_etag(md5(token.encode()).hexdigest())}
+    if last_modified is not None:
+        last_modified = timegm(last_modified.utctimetuple())
+        headers['Last-Modified'] = http_date(last_modified)
+    if request.method not in ('GET', 'HEAD'):
+        return None, {}
+    response = get_conditional_response(
+        request, etag=headers['ETag'], last_modified=last_modified
+    )
+    return response, headers
+
+
+def _revalidated(response, headers):
+    """Страница персональна и должна перепроверяться при каждом визите."""
+    if response.status_code != 200 or not headers:
+        return response
+    for name, value in headers.items():
+        response[name] = value
+    if response.has_header('Expires'):
+        del response['Expires']
+    patch_cache_control(response, private=True, no_cache=True, max_age=0)
+    return response
+
+
+def cache_feed(*key_funcs, timeout=FEED_CACHE_TIMEOUT):
+    """cache_page, у которого префикс ключа зависит от поколений лент.
+
+    Каждая key_func получает аргументы view и возвращает ключ ленты или
+    список ключей. Токен поколений служит и ETag страницы.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            keys = _source_keys()
+            for key_func in key_funcs:
+                key = key_func(request, *args, **kwargs)
+                keys.extend(key if isinstance(key, list) else [key])
+            token = _viewer_token(request, generation(*keys))
+            not_modified, headers = _conditional(request, token)
+            if not_modified is not None:
+                return not_modified
+            # Ключей у ленты подписок может быть сотни: в префикс идёт
+            # хэш токена.
+            prefix = md5(token.encode()).hexdigest()
+            cached_view = cache_page(timeout, key_prefix=f'feed.{prefix}')(
+                view
+            )
+            return _revalidated(
+                cached_view(request, *args, **kwargs), headers
+            )
+        return wrapper
+    return decorator
+
+
+def conditional_post(view=None, *, csrf=False):
+    """Условный GET для страницы поста: ETag и Last-Modified.
+
+    Валидаторы берутся из одной строки Post и поколений поста и автора,
+    без загрузки комментариев и рендера. csrf=True — для страниц с
+    формами: ETag меняется вместе с CSRF-токеном.
+    """
+    if view is None:
+        return partial(conditional_post, csrf=csrf)
+
+    @wraps(view)
+    def wrapper(request, post_id, *args, **kwargs):
+        row = Post.objects.filter(pk=post_id).values_list(
+            'updated', 'author_id', 'author__username'
+        ).first()
+        if row is None:
+            return view(request, post_id, *args, **kwargs)
+        updated, author_id, username = row
+        token = _viewer_token(request, generation(
+            *_source_keys(), post_key(post_id), author_key(username),
+            user_key(author_id),
+        ), csrf)
+        not_modified, headers = _conditional(request, token, updated)
+        if not_modified is not None:
+            return not_modified
+        return _revalidated(
+            view(request, post_id, *args, **kwargs), headers
+        )
+    return wrapper
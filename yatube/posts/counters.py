@@ -0,0 +1,127 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются сигналами в той же транзакции, что и запись в Post,
+Comment или Follow. Если счётчики разошлись с данными (массовые
+операции в обход сигналов, ручные правки базы), их чинит команда
+reconcile_counters.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+BATCH_SIZE = 1000
+USER_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def _count(model, field):
+    """Подзапрос с числом строк model, ссылающихся на внешний объект."""
+    rows = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(rows), 0)
+
+
+def _user_counts(users):
+    return users.annotate(**{
+        name: _count(model, field)
+        for name, (model, field) in USER_COUNTERS.items()
+    })
+
+
+def stats_for(user):
+    """Счётчики пользователя; отсутствующая строка считается заново."""
+    try:
+        return UserStats.objects.get(user=user)
+    except UserStats.DoesNotExist:
+        counts = _user_counts(User.objects.filter(pk=user.pk)).values(
+            *USER_COUNTERS
+        ).get()
+        stats, _ = UserStats.objects.get_or_create(user=user, defaults=counts)
+        return stats
+
+
+def change_user_counter(user_id, counter, delta):
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{counter: F(counter) + delta}
+    )
+    if not updated and delta > 0:
+        # Строки ещё нет: создаём её по фактическим данным, которые уже
+        # включают текущую запись. При уменьшении строку не создаём:
+        # пользователь может удаляться каскадно вместе со счётчиками.
+        stats_for(User(pk=user_id))
+
+
+def change_comments_count(post_id, delta):
+    # Комментарии выводятся на странице поста, поэтому для Last-Modified
+    # они тоже правка поста.
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta,
+        updated=timezone.now(),
+    )
+
+
+def _batches(queryset, batch_size):
+    last_pk = None
+    while True:
+        batch = queryset.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        batch = list(batch[:batch_size])
+        if not batch:
+            return
+        last_pk = batch[-1]['pk']
+        yield batch
+
+
+def reconcile_users(batch_size=BATCH_SIZE):
+    """Сверяет счётчики пользователей с данными. Возвращает число правок."""
+    fixed = 0
+    rows = _user_counts(User.objects.all()).values('pk', *USER_COUNTERS)
+    for batch in _batches(rows, batch_size):
+        existing = UserStats.objects.in_bulk([row['pk'] for row in batch])
+        to_create, to_update = [], []
+        for row in batch:
+            counts = {name: row[name] for name in USER_COUNTERS}
+            stats = existing.get(row['pk'])
+            if stats is None:
+                to_create.append(UserStats(user_id=row['pk'], **counts))
+            elif any(getattr(stats, k) != v for k, v in counts.items()):
+                for name, value in counts.items():
+                    setattr(stats, name, value)
+                to_update.append(stats)
+        with transaction.atomic():
+            UserStats.objects.bulk_create(to_create, ignore_conflicts=True)
+            UserStats.objects.bulk_update(to_update, list(USER_COUNTERS))
+        fixed += len(to_create) + len(to_update)
+    return fixed
+
+
+def reconcile_posts(batch_size=BATCH_SIZE):
+    """Сверяет счётчики комментариев постов. Возвращает число правок."""
+    fixed = 0
+    rows = Post.objects.annotate(
+        actual=_count(Comment, 'post')
+    ).values('pk', 'comments_count', 'actual')
+    for batch in _batches(rows, batch_size):
+        drifted = [
+            Post(pk=row['pk'], comments_count=row['actual'])
+            for row in batch
+            if row['comments_count'] != row['actual']
+        ]
+        with transaction.atomic():
+            Post.objects.bulk_update(drifted, ['comments_count'])
+        fixed += len(drifted)
+    return fixed
@@ -0,0 +1,123 @@
+"""Потоковая выгрузка групп, постов, комментариев и подписок.
+
+Записи читаются из базы кусками (QuerySet.iterator) и сразу
+превращаются в строки JSONL или CSV, поэтому расход памяти не зависит от
+размера таблиц. Формат записей тот же, что принимает import_content
+(см. posts/importer.py), так что выгрузку можно загрузить обратно.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Group, Post
+
+CHUNK_SIZE = 2000
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+CSV_COLUMNS = (
+    'type', 'id', 'slug', 'title', 'description', 'author', 'group',
+    'text', 'pub_date', 'image', 'post', 'created', 'user',
+)
+
+
+def _records(record_type, queryset, fields):
+    """Словари записей; ключи — имена полей формата импорта."""
+    names, columns = zip(*fields)
+    for row in queryset.values_list(*columns).iterator(CHUNK_SIZE):
+        record = {'type': record_type}
+        record.update(zip(names, row))
+        yield record
+
+
+def group_records(queryset=None):
+    queryset = Group.objects.all() if queryset is None else queryset
+    return _records('group', queryset.order_by('pk'), (
+        ('slug', 'slug'),
+        ('title', 'title'),
+        ('description', 'description'),
+    ))
+
+
+def post_records(queryset=None):
+    queryset = Post.objects.all() if queryset is None else queryset
+    return _records('post', queryset.order_by('pk'), (
+        ('id', 'pk'),
+        ('author', 'author__username'),
+        ('group', 'group__slug'),
+        ('text', 'text'),
+        ('pub_date', 'pub_date'),
+        ('image', 'image'),
+    ))
+
+
+def comment_records(queryset=None):
+    queryset = Comment.objects.all() if queryset is None else queryset
+    return _records('comment', queryset.order_by('pk'), (
+        ('post', 'post_id'),
+        ('author', 'author__username'),
+        ('text', 'text'),
+        ('created', 'created'),
+    ))
+
+
+def follow_records(queryset=None):
+    queryset = Follow.objects.all() if queryset is None else queryset
+    return _records('follow', queryset.order_by('pk'), (
+        ('user', 'user__username'),
+        ('author', 'author__username'),
+    ))
+
+
+# Порядок выгрузки: сначала то, на что ссылаются следующие записи.
+RECORD_TYPES = {
+    'group': group_records,
+    'post': post_records,
+    'comment': comment_records,
+    'follow': follow_records,
+}
+
+
+class _Echo:
+    """Файлоподобный объект для csv.writer: возвращает строку как есть."""
+
+    def write(self, value):
+        return value
+
+
+def jsonl_lines(records):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for record in records:
+        yield encoder.encode(record) + '\n'
+
+
+def csv_lines(records):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for record in records:
+        yield writer.writerow(
+            _csv_value(record.get(column)) for column in CSV_COLUMNS
+        )
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def lines(records, data_format):
+    """Строки выгрузки в формате data_format ('jsonl' или 'csv')."""
+    if data_format == 'csv':
+        return csv_lines(records)
+    return jsonl_lines(records)
+
+
+def all_records(record_types=tuple(RECORD_TYPES)):
+    for record_type, records in RECORD_TYPES.items():
+        if record_type in record_types:
+            yield from records()
@@ -0,0 +1,63 @@
+from .models import Comment, Post
+from .timeline import Timeline
+
+# Поля, которые выводит карточка поста includes/article.html.
+FEED_FIELDS = (
+    'text',
+    'pub_date',
+    'image',
+    'author',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group',
+    'group__slug',
+)
+# Поля, которые выводит список комментариев posts/includes/comments.html.
+COMMENT_FIELDS = (
+    'text',
+    'created',
+    'post',
+    'author',
+    'author__username',
+)
+
+
+def feed_posts(queryset=None):
+    """Посты для ленты: автор и группа одним JOIN, только нужные колонки."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    return (
+        queryset
+        .select_related('author', 'group')
+        .only(*FEED_FIELDS)
+        .order_by('-pub_date')
+    )
+
+
+def index_feed():
+    return feed_posts()
+
+
+def group_feed(group):
+    return feed_posts(Post.objects.filter(group=group))
+
+
+def profile_feed(author):
+    return feed_posts(Post.objects.filter(author=author))
+
+
+def follow_feed(user):
+    """Лента подписок и источники ключей её страниц для CursorPaginator."""
+    timeline = Timeline(user)
+    return feed_posts(timeline.posts()), timeline.keys()
+
+
+def post_comments(post):
+    """Комментарии поста с авторами одним JOIN, от старых к новым."""
+    return (
+        Comment.objects.filter(post=post)
+        .select_related('author')
+        .only(*COMMENT_FIELDS)
+        .order_by('created', 'pk')
+    )
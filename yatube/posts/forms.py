@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import Textarea
 
+from . import images
 from .models import Comment, Post
 
 
@@ -22,6 +24,12 @@ class PostForm(forms.ModelForm):
             'text': Textarea(attrs={'cols': 40, 'rows': 5}),
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return images.ingest(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,97 @@
+"""Приём картинок постов с ограниченным расходом памяти.
+
+Формат и размеры проверяются по заголовку файла, без декодирования
+пикселей. Слишком большие исходники уменьшаются ещё при декодировании
+(JPEG draft), EXIF удаляется, ориентация применяется к пикселям.
+Результат пишется во временный файл, который при превышении
+FILE_UPLOAD_MAX_MEMORY_SIZE уходит из памяти на диск.
+"""
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from PIL import Image, ImageOps
+
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+MAX_PIXELS = 40 * 1000 * 1000
+MAX_SIDE = 2560
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+JPEG_QUALITY = 85
+EXIF_ORIENTATION = 0x0112
+
+
+def _check(upload, image):
+    if upload.size and upload.size > MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            'Файл больше %(limit)d МБ.',
+            code='file_too_large',
+            params={'limit': MAX_UPLOAD_SIZE // (1024 * 1024)},
+        )
+    if image.format not in ALLOWED_FORMATS:
+        raise ValidationError(
+            'Формат %(format)s не поддерживается.',
+            code='invalid_format',
+            params={'format': image.format},
+        )
+    width, height = image.size
+    if width * height > MAX_PIXELS:
+        raise ValidationError(
+            'Картинка %(width)d×%(height)d слишком большая.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height},
+        )
+
+
+def _needs_processing(image):
+    orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+    return (
+        max(image.size) > MAX_SIDE
+        or orientation != 1
+        or 'exif' in image.info
+    )
+
+
+def ingest(upload):
+    """Проверяет загруженную картинку и готовит её к сохранению.
+
+    Картинки в пределах лимитов и без EXIF возвращаются как есть, чтобы
+    не перекодировать их и не терять анимацию GIF.
+    """
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+        _check(upload, image)
+        if getattr(image, 'is_animated', False) or not _needs_processing(
+            image
+        ):
+            upload.seek(0)
+            return upload
+        return _process(upload, image)
+    except (OSError, Image.DecompressionBombError):
+        # Обрезанный или испорченный файл проходит проверку заголовка и
+        # ломается только при декодировании пикселей.
+        raise ValidationError(
+            'Не удалось прочитать картинку: файл повреждён.',
+            code='invalid_image',
+        )
+
+
+def _process(upload, image):
+    image_format = image.format
+    if image_format == 'JPEG':
+        # Декодер JPEG сразу уменьшает картинку в 2, 4 или 8 раз, не
+        # разворачивая полноразмерный исходник в памяти.
+        image.draft('RGB', (MAX_SIDE, MAX_SIDE))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((MAX_SIDE, MAX_SIDE), Image.LANCZOS)
+
+    output = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    options = {'optimize': True}
+    if image_format == 'JPEG':
+        options['quality'] = JPEG_QUALITY
+    image.save(output, image_format, **options)
+    output.seek(0)
+    return File(output, name=upload.name)
@@ -0,0 +1,282 @@
+"""Массовый импорт групп, постов, комментариев и подписок.
+
+Записи читаются потоком (JSONL или CSV) и пишутся пачками через
+bulk_create, каждая пачка в своей транзакции. Авторы и группы ищутся по
+естественным ключам (username, slug) в словарях в памяти, а не запросом
+на каждую строку. Сигналы при bulk_create не срабатывают, поэтому
+счётчики, входящие, поисковый индекс, кэш лент и миниатюры
+пересчитываются один раз в конце (Importer.finish).
+
+Формат записи (JSON-объект или строка CSV с такими колонками):
+
+    type=user:    username
+    type=group:   slug, title, description
+    type=post:    id, author, group, text, pub_date, image
+    type=comment: post, author, text, created
+    type=follow:  user, author
+
+id поста — ключ в источнике: на него ссылается поле post комментариев.
+Пользователи, которых ещё нет, создаются без пароля.
+"""
+import csv
+import json
+from collections import Counter
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import caching, counters, search, thumbnails, timeline
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+BATCH_SIZE = 5000
+FORMATS = ('jsonl', 'csv')
+REBUILD_BATCH_SIZE = 500
+# Порядок записи пачек: сначала то, на что ссылаются остальные.
+MODELS = (User, Group, Post, Comment, Follow)
+TIMESTAMPS = (
+    (Post, 'pub_date'), (Post, 'updated'), (Comment, 'created'),
+)
+
+
+class ImportRecordError(ValueError):
+    pass
+
+
+def read_records(stream, data_format):
+    """Записи из потока по одной, без чтения файла целиком."""
+    if data_format == 'csv':
+        for row in csv.DictReader(stream):
+            yield {key: value for key, value in row.items() if value != ''}
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                yield ImportRecordError(f'битый JSON: {error}')
+
+
+@contextmanager
+def source_timestamps():
+    """bulk_create без auto_now: даты берутся из источника."""
+    fields = [model._meta.get_field(name) for model, name in TIMESTAMPS]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _next_pk(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def _required(record, name):
+    value = record.get(name)
+    if value in (None, ''):
+        raise ImportRecordError(f'нет поля {name}')
+    return value
+
+
+def _datetime(value):
+    if not value:
+        return timezone.now()
+    try:
+        parsed = parse_datetime(value)
+    except (ValueError, TypeError):
+        # Формат верный, но такой даты нет (2024-13-45) или это не строка.
+        parsed = None
+    if parsed is None:
+        raise ImportRecordError(f'неверная дата {value!r}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class Importer:
+    """Копит записи и пишет их пачками.
+
+    bulk_create в SQLite не возвращает первичные ключи, поэтому ключи
+    новых пользователей, групп и постов назначаются заранее, начиная с
+    текущего максимума. Импорт рассчитан на монопольную запись.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.users = dict(
+            User.objects.values_list('username', 'pk').iterator()
+        )
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.posts = {}
+        self.next_pk = {
+            model: _next_pk(model) for model in (User, Group, Post)
+        }
+        self.pending = {model: [] for model in MODELS}
+        self.stats = Counter()
+        self.first_post_pk = self.next_pk[Post]
+        self.authors = set()
+        self.followers = set()
+
+    def _allocate(self, model):
+        pk = self.next_pk[model]
+        self.next_pk[model] += 1
+        return pk
+
+    def _user(self, username):
+        if username not in self.users:
+            user = User(pk=self._allocate(User), username=username)
+            user.set_unusable_password()
+            self.pending[User].append(user)
+            self.users[username] = user.pk
+        return self.users[username]
+
+    def _group(self, slug):
+        if not slug:
+            return None
+        if slug not in self.groups:
+            raise ImportRecordError(f'нет группы {slug!r}')
+        return self.groups[slug]
+
+    def add(self, record):
+        if isinstance(record, Exception):
+            raise record
+        if not isinstance(record, dict):
+            raise ImportRecordError('запись — не объект')
+        kind = record.get('type')
+        handler = getattr(self, f'_add_{kind}', None)
+        if handler is None:
+            raise ImportRecordError(f'неизвестный тип записи {kind!r}')
+        try:
+            handler(record)
+        except ImportRecordError:
+            raise
+        except (ValueError, TypeError) as error:
+            # Значение не того типа: список вместо строки и т. п.
+            raise ImportRecordError(f'неверное значение: {error}') from error
+        self.stats[kind] += 1
+        if sum(map(len, self.pending.values())) >= self.batch_size:
+            self.flush()
+
+    def _add_user(self, record):
+        self._user(_required(record, 'username'))
+
+    def _add_group(self, record):
+        slug = _required(record, 'slug')
+        if slug in self.groups:
+            return
+        group = Group(
+            pk=self._allocate(Group),
+            slug=slug,
+            title=record.get('title') or slug,
+            description=record.get('description', ''),
+        )
+        self.pending[Group].append(group)
+        self.groups[slug] = group.pk
+
+    def _add_post(self, record):
+        source_id = str(_required(record, 'id'))
+        if source_id in self.posts:
+            raise ImportRecordError(f'пост {source_id} уже был')
+        text = _required(record, 'text')
+        username = _required(record, 'author')
+        group_id = self._group(record.get('group'))
+        pub_date = _datetime(record.get('pub_date'))
+        post = Post(
+            pk=self._allocate(Post),
+            author_id=self._user(username),
+            group_id=group_id,
+            text=text,
+            image=record.get('image', ''),
+            pub_date=pub_date,
+            updated=pub_date,
+        )
+        self.pending[Post].append(post)
+        self.posts[source_id] = post.pk
+        self.authors.add(post.author_id)
+
+    def _add_comment(self, record):
+        source_id = str(_required(record, 'post'))
+        if source_id not in self.posts:
+            raise ImportRecordError(f'нет поста {source_id}')
+        text = _required(record, 'text')
+        username = _required(record, 'author')
+        created = _datetime(record.get('created'))
+        self.pending[Comment].append(Comment(
+            post_id=self.posts[source_id],
+            author_id=self._user(username),
+            text=text,
+            created=created,
+        ))
+
+    def _add_follow(self, record):
+        username = _required(record, 'user')
+        author = _required(record, 'author')
+        if username == author:
+            raise ImportRecordError('подписка на самого себя')
+        user_id, author_id = self._user(username), self._user(author)
+        self.pending[Follow].append(
+            Follow(user_id=user_id, author_id=author_id)
+        )
+        self.followers.add(user_id)
+
+    def flush(self):
+        with source_timestamps(), transaction.atomic():
+            for model in MODELS:
+                objects = self.pending[model]
+                if objects:
+                    # Размер одного INSERT бэкенд выбирает сам: у SQLite
+                    # есть пределы на число параметров и UNION ALL.
+                    model.objects.bulk_create(
+                        objects, ignore_conflicts=model is Follow,
+                    )
+                    self.pending[model] = []
+
+    def finish(self, generate_thumbnails=True):
+        """Пересчитывает производные данные один раз на весь импорт."""
+        self.flush()
+        counters.reconcile_users()
+        counters.reconcile_posts()
+        # Входящие пересобираются тем, кто подписался при импорте или
+        # подписан на авторов импортированных постов.
+        readers = set(self.followers)
+        authors = sorted(self.authors)
+        for start in range(0, len(authors), REBUILD_BATCH_SIZE):
+            readers.update(Follow.objects.filter(
+                author_id__in=authors[start:start + REBUILD_BATCH_SIZE]
+            ).values_list('user_id', flat=True).iterator())
+        readers = sorted(readers)
+        for start in range(0, len(readers), REBUILD_BATCH_SIZE):
+            timeline.rebuild(readers[start:start + REBUILD_BATCH_SIZE])
+        caching.bump(caching.SITE, caching.INDEX)
+        images = Post.objects.filter(
+            pk__gte=self.first_post_pk
+        ).exclude(image='').values_list('image', flat=True).order_by('pk')
+        if generate_thumbnails and images.exists():
+            done, failed = thumbnails.generate_many(images.iterator())
+            self.stats['thumbnails'] += done
+            self.stats['thumbnail_errors'] += failed
+
+
+def run(records, batch_size=BATCH_SIZE, generate_thumbnails=True,
+        on_error=None):
+    """Импортирует записи. on_error(номер, ошибка) — для битых записей."""
+    importer = Importer(batch_size)
+    with search.triggers_suspended():
+        for number, record in enumerate(records, start=1):
+            try:
+                importer.add(record)
+            except ImportRecordError as error:
+                importer.stats['skipped'] += 1
+                if on_error is not None:
+                    on_error(number, error)
+        importer.finish(generate_thumbnails)
+    return importer.stats
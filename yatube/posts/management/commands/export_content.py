@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exporter
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, посты, комментарии и подписки в JSONL или CSV '
+        'потоком, не загружая таблицы в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл для выгрузки; «-» или без аргумента — stdout.',
+        )
+        parser.add_argument(
+            '--format', choices=exporter.FORMATS, default='jsonl',
+            help='Формат выгрузки.',
+        )
+        parser.add_argument(
+            '--type', action='append', dest='types',
+            choices=tuple(exporter.RECORD_TYPES),
+            help='Что выгружать; можно указать несколько раз. '
+                 'По умолчанию — всё.',
+        )
+
+    def handle(self, *args, **options):
+        types = options['types'] or tuple(exporter.RECORD_TYPES)
+        lines = exporter.lines(
+            exporter.all_records(types), options['format']
+        )
+        if options['path'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        try:
+            stream = open(
+                options['path'], 'w', encoding='utf-8', newline=''
+            )
+        except OSError as error:
+            raise CommandError(error)
+        with stream:
+            stream.writelines(lines)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгрузка записана в {options["path"]}'
+        ))
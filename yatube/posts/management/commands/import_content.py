@@ -0,0 +1,62 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует группы, посты, комментарии и подписки из JSONL или '
+        'CSV пачками через bulk_create. Формат записей описан в '
+        'posts/importer.py.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл с записями; «-» — читать из stdin.',
+        )
+        parser.add_argument(
+            '--format', choices=importer.FORMATS,
+            help='Формат файла. По умолчанию — по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=importer.BATCH_SIZE,
+            help='Сколько записей писать в одной транзакции.',
+        )
+        parser.add_argument(
+            '--skip-thumbnails', action='store_true',
+            help='Не строить миниатюры импортированных картинок.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        data_format = options['format']
+        if data_format is None:
+            extension = os.path.splitext(path)[1].lstrip('.').lower()
+            data_format = 'csv' if extension == 'csv' else 'jsonl'
+        if path == '-':
+            return self.run(sys.stdin, data_format, options)
+        try:
+            stream = open(path, encoding='utf-8', newline='')
+        except OSError as error:
+            raise CommandError(error)
+        with stream:
+            self.run(stream, data_format, options)
+
+    def run(self, stream, data_format, options):
+        stats = importer.run(
+            importer.read_records(stream, data_format),
+            batch_size=options['batch_size'],
+            generate_thumbnails=not options['skip_thumbnails'],
+            on_error=self.report_error,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Импортировано: групп {group}, постов {post}, комментариев '
+            '{comment}, подписок {follow}; пропущено записей: {skipped}'
+            .format_map(stats)
+        ))
+
+    def report_error(self, number, error):
+        self.stderr.write(f'Запись {number}: {error}')
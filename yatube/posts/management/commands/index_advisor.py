@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import query_plans
+
+
+class Command(BaseCommand):
+    help = (
+        'Повторяет запросы лент и сообщает о тех, что читают таблицу '
+        'целиком или сортируют строки во временном B-дереве.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Выводить SQL и план каждого запроса, а не только '
+                 'проблемных.',
+        )
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Завершиться с ошибкой, если есть проблемные запросы.',
+        )
+
+    def handle(self, *args, **options):
+        replays = query_plans.replay()
+        failed = [replay for replay in replays if replay.problems]
+        for replay in replays:
+            if replay.problems:
+                self.stdout.write(self.style.ERROR(f'{replay.name}:'))
+                for problem in replay.problems:
+                    self.stdout.write(f'  {problem}')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{replay.name}: OK'))
+            if replay.problems or options['verbose_plans']:
+                self.stdout.write(f'  {replay.sql}')
+                for detail in replay.plan:
+                    self.stdout.write(f'    {detail}')
+        if failed and options['strict']:
+            raise CommandError(
+                f'Запросов с полным проходом или сортировкой: {len(failed)}'
+            )
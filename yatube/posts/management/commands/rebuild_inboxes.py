@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок с нуля.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='id пользователя, чью ленту нужно пересобрать.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            follows = timeline.rebuild(options['user_ids'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Подписок обработано: {follows}')
+        )
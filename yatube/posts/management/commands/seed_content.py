@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importer, synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками со степенными распределениями — '
+        'для замеров производительности на объёмах продакшена.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=30000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument(
+            '--image-share', type=float, default=synthetic.IMAGE_SHARE,
+            help='Доля постов с картинкой.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=importer.BATCH_SIZE,
+            help='Сколько записей писать в одной транзакции.',
+        )
+        parser.add_argument(
+            '--seed', type=int,
+            help='Зерно генератора: с ним данные воспроизводимы.',
+        )
+        parser.add_argument(
+            '--skip-thumbnails', action='store_true',
+            help='Не строить миниатюры картинок.',
+        )
+
+    def handle(self, *args, **options):
+        counts = {
+            name: options[name]
+            for name in ('users', 'groups', 'posts', 'comments', 'follows')
+        }
+        if any(count < 0 for count in counts.values()):
+            raise CommandError('Количества не могут быть отрицательными.')
+        if counts['users'] == 0 and counts['posts']:
+            raise CommandError('Постам нужны авторы: укажите --users.')
+        if counts['posts'] == 0 and counts['comments']:
+            raise CommandError('Комментариям нужны посты: укажите --posts.')
+        if not 0 <= options['image_share'] <= 1:
+            raise CommandError('--image-share должен быть от 0 до 1.')
+        stats = synthetic.run(
+            **counts,
+            image_share=options['image_share'],
+            batch_size=options['batch_size'],
+            generate_thumbnails=not options['skip_thumbnails'],
+            seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Создано: пользователей {user}, групп {group}, постов {post}, '
+            'комментариев {comment}, подписок {follow}'.format_map(stats)
+        ))
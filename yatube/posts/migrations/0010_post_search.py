@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# SQL записан здесь целиком, а не берётся из posts.search: миграция
+# должна создавать ту же схему, как бы потом ни менялся код приложения.
+# Триггеры после каждого migrate восстанавливает search.install_triggers
+# своей копией того же SQL.
+DELETE_ROW = (
+    "INSERT INTO posts_post_fts (posts_post_fts, rowid, text) "
+    "VALUES ('delete', old.id, "
+    "replace(replace(old.text, 'ё', 'е'), 'Ё', 'Е'));"
+)
+INSERT_ROW = (
+    "INSERT INTO posts_post_fts (rowid, text) "
+    "VALUES (new.id, replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е'));"
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_image_hashed_storage'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+                "text, content='', "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')",
+                "INSERT INTO posts_post_fts (rowid, text) "
+                "SELECT id, replace(replace(posts_post.text, 'ё', 'е'), "
+                "'Ё', 'Е') FROM posts_post",
+                'CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert '
+                f'AFTER INSERT ON posts_post BEGIN {INSERT_ROW} END',
+                'CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete '
+                f'AFTER DELETE ON posts_post BEGIN {DELETE_ROW} END',
+                'CREATE TRIGGER IF NOT EXISTS posts_post_fts_update '
+                'AFTER UPDATE OF text ON posts_post BEGIN '
+                f'{DELETE_ROW} {INSERT_ROW} END',
+            ],
+            reverse_sql=[
+                'DROP TRIGGER posts_post_fts_update',
+                'DROP TRIGGER posts_post_fts_delete',
+                'DROP TRIGGER posts_post_fts_insert',
+                'DROP TABLE posts_post_fts',
+            ],
+        ),
+    ]
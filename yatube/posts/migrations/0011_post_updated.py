@@ -0,0 +1,22 @@
+# Generated by Django 2.2.16 on 2026-10-17 04:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunSQL(
+            sql='UPDATE posts_post SET updated = pub_date',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.storage import HashedFileSystemStorage
+
 User = get_user_model()
 SLICE_SIZE = 15
 
@@ -14,6 +16,10 @@ class Post(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -32,8 +38,28 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=HashedFileSystemStorage(),
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
+
+    class Meta:
+        # Ленты сортируются по (-pub_date, -pk). Индексы по возрастанию:
+        # SQLite читает их с конца, и неявный rowid в хвосте индекса
+        # даёт тот же порядок для pk без сортировки во временном B-дереве.
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_pub_date'),
+            models.Index(
+                fields=['author', 'pub_date'], name='post_author_pub_date'
+            ),
+            models.Index(
+                fields=['group', 'pub_date'], name='post_group_pub_date'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:SLICE_SIZE]
@@ -70,6 +96,13 @@ class Comment(models.Model):
         auto_now_add=True,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created'], name='comment_post_created'
+            ),
+        ]
+
     def __str__(self):
         return self.text[:SLICE_SIZE]
 
@@ -93,3 +126,58 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Автор, на кого подписались',
     )
+
+
+class InboxEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        related_name='inbox_entries',
+        on_delete=models.CASCADE,
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        'Post',
+        related_name='inbox_entries',
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        on_delete=models.CASCADE,
+        verbose_name='Автор поста',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_inbox_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='inbox_user_pub_date_post',
+            ),
+            models.Index(
+                fields=['user', 'author'], name='inbox_user_author'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        related_name='stats',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
@@ -0,0 +1,231 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from collections import namedtuple
+from operator import itemgetter
+
+from django.core.paginator import Paginator
+from django.db.models import Max, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+# Источник ключей страницы: queryset и его поля, соответствующие полям
+# ordering паджинатора; последнее поле — pk объекта ленты.
+KeySource = namedtuple('KeySource', 'queryset fields')
+
+
+def encode_cursor(values):
+    """Упаковывает значения ключа сортировки в непрозрачный токен."""
+    raw = '|'.join(
+        value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        for value in values
+    )
+    return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _parse(part, field):
+    """Значение поля из токена или None, если оно не разбирается."""
+    try:
+        if field.get_internal_type() == 'DateTimeField':
+            # ValueError — формат верный, но даты нет, например 2024-13-45.
+            return parse_datetime(part)
+        return field.to_python(part)
+    except Exception:
+        return None
+
+
+def decode_cursor(token, fields):
+    """Распаковывает токен курсора. Возвращает None, если токен битый."""
+    if not token:
+        return None
+    try:
+        padding = '=' * (-len(token) % 4)
+        raw = urlsafe_b64decode(token + padding).decode()
+    except (BinasciiError, UnicodeDecodeError, ValueError):
+        return None
+    parts = raw.split('|')
+    if len(parts) != len(fields):
+        return None
+    values = [_parse(part, field) for part, field in zip(parts, fields)]
+    if None in values:
+        return None
+    return values
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация без COUNT(*) и OFFSET.
+
+    Страница выбирается по значениям ключа сортировки последней (after)
+    или первой (before) записи соседней страницы, поэтому стоимость
+    запроса не зависит от глубины страницы. Последнее поле ordering
+    должно быть уникальным, например pk. Сортировать можно и по
+    аннотациям queryset: их поля передаются в annotations.
+
+    Если ключи сортировки лежат в другой таблице (входящие ленты
+    подписок), их источники передаются в keys: страница ключей
+    выбирается по индексу этой таблицы, а из object_list читаются только
+    объекты страницы.
+    """
+    cursor = True
+
+    def __init__(self, object_list, per_page,
+                 ordering=('-pub_date', '-pk'), after=None, before=None,
+                 annotations=None, keys=None):
+        super().__init__(object_list, per_page)
+        self.ordering = ordering
+        self.keys = keys
+        self.page_keys = None
+        self.annotations = annotations or {}
+        self.fields = [
+            self._get_field(name.lstrip('-')) for name in ordering
+        ]
+        self.after = decode_cursor(after, self.fields)
+        self.before = None if self.after else decode_cursor(
+            before, self.fields
+        )
+        self.has_next = False
+        self.has_previous = False
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def _get_field(self, name):
+        if name in self.annotations:
+            return self.annotations[name]
+        opts = self.object_list.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def _attnames(self):
+        attnames = []
+        for name, field in zip(self.ordering, self.fields):
+            name = name.lstrip('-')
+            if name != 'pk' and name not in self.annotations:
+                name = field.attname
+            attnames.append(name)
+        return attnames
+
+    def _keyset_filter(self, values, forward, names=None):
+        """Условие «строго после values» в порядке сортировки."""
+        condition = Q()
+        if names is None:
+            names = [name.lstrip('-') for name in self.ordering]
+        for index, name in enumerate(names):
+            descending = self.ordering[index].startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[index]})
+            for prev_name, prev_value in zip(names[:index], values[:index]):
+                step &= Q(**{prev_name: prev_value})
+            condition |= step
+        return condition
+
+    def _reversed_ordering(self):
+        return [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ]
+
+    def _key(self, obj):
+        return [getattr(obj, attname) for attname in self._attnames()]
+
+    def _key_ordering(self):
+        return self._reversed_ordering() if self.before else self.ordering
+
+    def key_querysets(self):
+        """Запросы ключей страницы к каждому источнику из keys."""
+        values = self.before or self.after
+        ordering = self._key_ordering()
+        querysets = []
+        for source in self.keys:
+            queryset = source.queryset
+            if values:
+                queryset = queryset.filter(self._keyset_filter(
+                    values, not self.before, source.fields
+                ))
+            queryset = queryset.order_by(*[
+                f'-{field}' if name.startswith('-') else field
+                for name, field in zip(ordering, source.fields)
+            ])
+            querysets.append(
+                queryset.values_list(*source.fields)[:self.per_page + 1]
+            )
+        return querysets
+
+    def _page_keys(self):
+        """pk объектов страницы по всем источникам, в порядке страницы."""
+        rows = [row for queryset in self.key_querysets() for row in queryset]
+        # Слияние источников: сортировка по полям с конца устойчива.
+        ordering = self._key_ordering()
+        for index in reversed(range(len(ordering))):
+            rows.sort(
+                key=itemgetter(index), reverse=ordering[index].startswith('-')
+            )
+        keys = []
+        for row in rows:
+            if row[-1] not in keys:
+                keys.append(row[-1])
+        return keys[:self.per_page + 1]
+
+    def page_queryset(self):
+        """Запрос страницы: на одну запись больше, чтобы узнать о следующей."""
+        queryset = self.object_list
+        if self.keys is not None:
+            # Порядок уже известен по ключам: сортировать в SQL незачем.
+            self.page_keys = self._page_keys()
+            return queryset.filter(pk__in=self.page_keys).order_by()
+        if self.before:
+            queryset = queryset.filter(
+                self._keyset_filter(self.before, forward=False)
+            ).order_by(*self._reversed_ordering())
+        else:
+            queryset = queryset.order_by(*self.ordering)
+            if self.after:
+                queryset = queryset.filter(
+                    self._keyset_filter(self.after, forward=True)
+                )
+        return queryset[:self.per_page + 1]
+
+    def page(self, number=None):
+        items = list(self.page_queryset())
+        if self.keys is not None:
+            position = {pk: index for index, pk in enumerate(self.page_keys)}
+            items.sort(key=lambda item: position[item.pk])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if self.before:
+            items.reverse()
+            self.has_previous = has_more
+            self.has_next = True
+        else:
+            self.has_next = has_more
+            self.has_previous = self.after is not None
+        if items:
+            self.next_cursor = encode_cursor(self._key(items[-1]))
+            self.previous_cursor = encode_cursor(self._key(items[0]))
+        else:
+            self.has_next = self.has_previous = False
+        return self._get_page(items, 1, self)
+
+    def get_page(self, number=None):
+        return self.page(number)
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для больших таблиц в админке.
+
+    Без фильтров число строк оценивается по максимальному pk: в SQLite
+    это один шаг по B-дереву вместо COUNT(*) по всей таблице. Удалённые
+    строки оценка не учитывает, поэтому точный COUNT(*) остаётся для
+    небольших таблиц и для отфильтрованных списков.
+    """
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, 'query') and not queryset.query.where:
+            estimate = queryset.aggregate(estimate=Max('pk'))['estimate']
+            if estimate and estimate > self.exact_count_limit:
+                return estimate
+        return super().count
@@ -0,0 +1,118 @@
+"""Проверка планов запросов лент.
+
+Запросы строятся так же, как во views: те же queryset из feeds и тот же
+CursorPaginator, первая страница и страница после курсора. Для каждого
+берётся EXPLAIN QUERY PLAN, и в плане ищутся полные проходы по таблице
+без индекса и сортировки во временном B-дереве: на больших таблицах это
+чтение и сортировка всех строк-кандидатов ради одной страницы.
+"""
+import re
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from . import feeds, views
+from .models import Group, Post, UserStats
+from .paginators import CursorPaginator, encode_cursor
+
+User = get_user_model()
+# Строки плана SQLite, которые на больших таблицах означают проблему.
+FULL_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW)\S+$')
+TEMP_SORT = re.compile(r'USE TEMP B-TREE')
+HINTS = (
+    (FULL_SCAN, 'полный проход по таблице: нужен индекс по полям WHERE'),
+    (TEMP_SORT, 'сортировка во временном B-дереве: нужен индекс, '
+                'заканчивающийся полями ORDER BY'),
+)
+
+Replay = namedtuple('Replay', 'name sql plan problems')
+
+
+def problems(plan):
+    """Строки плана с проблемами и подсказки к ним."""
+    return [
+        f'{detail} — {hint}'
+        for detail in plan
+        for pattern, hint in HINTS
+        if pattern.search(detail)
+    ]
+
+
+def explain(sql, params):
+    if connection.vendor != 'sqlite':
+        raise NotImplementedError('Планы разбираются только для SQLite.')
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def _busiest():
+    """Самые нагруженные автор, читатель, группа и пост.
+
+    В пустой базе — несохранённые объекты: планы от данных не зависят.
+    """
+    author_id = UserStats.objects.order_by(
+        '-posts_count'
+    ).values_list('user_id', flat=True).first()
+    reader_id = UserStats.objects.order_by(
+        '-following_count'
+    ).values_list('user_id', flat=True).first()
+    return (
+        User(pk=author_id or 0),
+        User(pk=reader_id or 0),
+        Group.objects.annotate(
+            total=Count('posts')
+        ).order_by('-total').first() or Group(pk=0),
+        Post.objects.order_by('-comments_count').only('pk').first()
+        or Post(pk=0),
+    )
+
+
+def feed_pages():
+    """(имя, CursorPaginator) для первой страницы и страницы по курсору."""
+    author, reader, group, post = _busiest()
+    cursor = encode_cursor([timezone.now(), 0])
+    follow_posts, follow_keys = feeds.follow_feed(reader)
+    feed_list = (
+        ('index', feeds.index_feed(), {}),
+        ('group', feeds.group_feed(group), {}),
+        ('profile', feeds.profile_feed(author), {}),
+        ('follow', follow_posts, {'keys': follow_keys}),
+        ('comments', feeds.post_comments(post),
+         {'ordering': ('created', 'pk')}),
+    )
+    for name, queryset, options in feed_list:
+        per_page = (
+            views.COMMENTS_ON_PAGE if name == 'comments'
+            else views.POSTS_ON_PAGE
+        )
+        yield name, CursorPaginator(queryset, per_page, **options)
+        yield f'{name} (after)', CursorPaginator(
+            queryset, per_page, after=cursor, **options
+        )
+
+
+def replay():
+    """Планы запросов лент: список Replay."""
+    replays = []
+    for name, pages in feed_pages():
+        queries = [(name, pages.page_queryset())]
+        if pages.keys is not None:
+            queries.extend(
+                (f'{name}: ключи', queryset)
+                for queryset in pages.key_querysets()
+            )
+        for title, queryset in queries:
+            compiler = queryset.query.get_compiler(connection=connection)
+            try:
+                sql, params = compiler.as_sql()
+            except EmptyResultSet:
+                # Пустая страница ключей: запрос к базе не выполняется.
+                continue
+            plan = explain(sql, params)
+            replays.append(Replay(title, sql, plan, problems(plan)))
+    return replays
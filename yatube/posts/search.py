@@ -0,0 +1,173 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Индекс posts_post_fts (миграция 0010) обновляется триггерами на
+posts_post, поэтому в него попадают и записи в обход сигналов:
+bulk_create, update(), правки базы вручную. Индекс не хранит копию
+текста (contentless), а ё заменяется на е ещё в триггере.
+
+SQLite меняет схему таблицы, пересоздавая её, и триггеры при этом
+пропадают. Поэтому они восстанавливаются после каждого migrate.
+Миграция 0010 держит свою копию SQL: правки здесь на неё не влияют.
+
+Токенизатор unicode61 приводит кириллицу к нижнему регистру, но
+морфологию не знает. Поэтому слова запроса обрезаются до основы по
+типичным русским окончаниям и ищутся как префиксы: «котами» находит
+«кот», «кота» и «котов». Префиксный поиск ускоряет индекс prefix.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connections, transaction
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'posts_post_fts'
+MIN_STEM = 3
+MAX_TERMS = 10
+WORD_RE = re.compile(r'\w+')
+# Окончания от длинных к коротким: отрезается самое длинное подходящее.
+ENDINGS = tuple(sorted((
+    'иями', 'ями', 'ами', 'ией', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ться', 'тся', 'ешь', 'ишь', 'ете', 'ите', 'ала', 'яла', 'ила', 'ыла',
+    'ая', 'яя', 'ое', 'ее', 'ой', 'ей', 'ий', 'ый', 'ых', 'их', 'ом',
+    'ем', 'ам', 'ям', 'ах', 'ях', 'ов', 'ев', 'ью', 'ия', 'ие', 'ии',
+    'ию', 'ть', 'ет', 'ют', 'ут', 'ит', 'ат', 'ят', 'ла', 'ло', 'ли',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True))
+
+
+def _normalized(row):
+    return f"replace(replace({row}.text, 'ё', 'е'), 'Ё', 'Е')"
+
+
+_DELETE_ROW = (
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, {_normalized('old')});"
+)
+_INSERT_ROW = (
+    f"INSERT INTO {FTS_TABLE} (rowid, text) "
+    f"VALUES (new.id, {_normalized('new')});"
+)
+CREATE_INDEX_SQL = (
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"text, content='', "
+    f"tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+)
+FILL_INDEX_SQL = (
+    f"INSERT INTO {FTS_TABLE} (rowid, text) "
+    f"SELECT id, {_normalized('posts_post')} FROM posts_post"
+)
+TRIGGERS_SQL = (
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert '
+    f'AFTER INSERT ON posts_post BEGIN {_INSERT_ROW} END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete '
+    f'AFTER DELETE ON posts_post BEGIN {_DELETE_ROW} END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update '
+    f'AFTER UPDATE OF text ON posts_post BEGIN {_DELETE_ROW} '
+    f'{_INSERT_ROW} END',
+)
+TRIGGER_NAMES = tuple(
+    f'{FTS_TABLE}_{event}' for event in ('insert', 'delete', 'update')
+)
+REBUILD_INDEX_SQL = (
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('delete-all')",
+    FILL_INDEX_SQL,
+)
+RANK_SQL = (
+    f'SELECT bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+    f'WHERE {FTS_TABLE} MATCH %s AND rowid = posts_post.id'
+)
+MATCH_SQL = (
+    f'posts_post.id IN '
+    f'(SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)'
+)
+
+
+def normalize(word):
+    return word.lower().replace('ё', 'е')
+
+
+def stem(word):
+    """Основа слова: без окончания, но не короче MIN_STEM символов."""
+    word = normalize(word)
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def match_expression(query):
+    """Запрос FTS5: все слова обязательны, каждое — как префикс основы.
+
+    Возвращает None, если в запросе нет ни одного слова. Основы берутся
+    в кавычки, так что синтаксис FTS5 из пользовательского ввода не
+    интерпретируется.
+    """
+    stems = []
+    for word in WORD_RE.findall(query):
+        word_stem = stem(word).replace('_', '')
+        if word_stem and word_stem not in stems:
+            stems.append(word_stem)
+    if not stems:
+        return None
+    return ' AND '.join(f'"{word_stem}"*' for word_stem in stems[:MAX_TERMS])
+
+
+def matching(queryset, query):
+    """Посты из queryset, подходящие под запрос. Пустой запрос — пусто."""
+    expression = match_expression(query)
+    if expression is None:
+        return queryset.none()
+    # RawSQL в pk__in превращается в скалярный подзапрос «IN ((…))»,
+    # который вернул бы только первую строку.
+    return queryset.extra(where=[MATCH_SQL], params=[expression])
+
+
+def ranked(queryset, query):
+    """matching() с релевантностью rank: чем меньше, тем выше (BM25)."""
+    expression = match_expression(query)
+    if expression is None:
+        # Аннотация нужна и пустому результату: по rank его сортируют.
+        return queryset.annotate(
+            rank=Value(0, output_field=FloatField())
+        ).none()
+    return matching(queryset, query).annotate(
+        rank=RawSQL(RANK_SQL, [expression], output_field=FloatField())
+    )
+
+
+def install_triggers(using='default', **kwargs):
+    """Обработчик post_migrate: возвращает триггеры индекса на место."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    if FTS_TABLE not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        for statement in TRIGGERS_SQL:
+            cursor.execute(statement)
+
+
+def rebuild_index(using='default'):
+    """Заполняет индекс заново по текущему содержимому posts_post."""
+    with connections[using].cursor() as cursor:
+        for statement in REBUILD_INDEX_SQL:
+            cursor.execute(statement)
+
+
+@contextmanager
+def triggers_suspended(using='default'):
+    """Массовая запись без триггеров; индекс строится один раз в конце."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    with connection.cursor() as cursor:
+        for name in TRIGGER_NAMES:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    try:
+        yield
+    finally:
+        with transaction.atomic(using=using):
+            install_triggers(using)
+            rebuild_index(using)
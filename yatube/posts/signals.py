@@ -0,0 +1,137 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import caching, counters, timeline
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+# Посты, которые удаляются сейчас в этом потоке: их комментарии уходят
+# каскадом, и пересчитывать счётчик и сбрасывать кэш для каждого
+# комментария незачем.
+_deleting = threading.local()
+
+
+def _deleting_posts():
+    if not hasattr(_deleting, 'post_ids'):
+        _deleting.post_ids = set()
+    return _deleting.post_ids
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, raw=False, **kwargs):
+    instance._previous_group_id = None
+    if instance.pk and not raw:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.change_user_counter(instance.author_id, 'posts_count', 1)
+        timeline.fan_out(instance)
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    caching.invalidate_post(instance, [previous_group_id])
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    # Collector шлёт pre_delete всем объектам до удаления первого из них.
+    _deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _deleting_posts().discard(instance.pk)
+    counters.change_user_counter(instance.author_id, 'posts_count', -1)
+    caching.invalidate_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.change_comments_count(instance.post_id, 1)
+    caching.invalidate_post(instance.post)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id in _deleting_posts():
+        return
+    counters.change_comments_count(instance.post_id, -1)
+    post = Post.objects.filter(pk=instance.post_id).first()
+    if post is not None:
+        caching.invalidate_post(post)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        caching.bump(caching.SITE, caching.group_id_key(instance.pk))
+
+
+USER_CARD_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(pre_save, sender=User)
+def remember_user_name(sender, instance, raw=False, update_fields=None,
+                       **kwargs):
+    instance._name_changed = False
+    if raw or not instance.pk:
+        return
+    if update_fields is not None and not USER_CARD_FIELDS & set(
+        update_fields
+    ):
+        return
+    previous = User.objects.filter(pk=instance.pk).values(
+        *USER_CARD_FIELDS
+    ).first()
+    instance._name_changed = previous is not None and any(
+        previous[field] != getattr(instance, field)
+        for field in USER_CARD_FIELDS
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, raw=False, **kwargs):
+    if getattr(instance, '_name_changed', False):
+        caching.bump(caching.SITE, caching.user_key(instance.pk))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user_counter(instance.author_id, 'followers_count', 1)
+        counters.change_user_counter(instance.user_id, 'following_count', 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        _invalidate_follow(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user_counter(instance.author_id, 'followers_count', -1)
+    counters.change_user_counter(instance.user_id, 'following_count', -1)
+    timeline.prune(instance.user_id, instance.author_id)
+    timeline.demote(instance.author_id)
+    _invalidate_follow(instance)
+
+
+def _invalidate_follow(follow):
+    keys = [caching.follow_key(follow.user_id)]
+    keys.extend(
+        caching.author_key(username) for username in User.objects.filter(
+            pk__in=[follow.user_id, follow.author_id]
+        ).values_list('username', flat=True)
+    )
+    caching.bump(*keys)
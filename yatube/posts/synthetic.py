@@ -0,0 +1,248 @@
+"""Синтетические данные продакшен-масштаба для локальных замеров.
+
+Распределения степенные, как в живой соцсети: у немногих авторов
+огромные аудитории и много постов, у большинства — единицы; немногие
+группы собирают почти все посты, остальные составляют длинный хвост;
+комментарии сосредоточены на небольшой доле постов.
+
+Записи генерируются потоком в формате posts/importer.py и пишутся тем же
+импортом: пачками через bulk_create с заранее назначенными ключами, с
+пересчётом счётчиков, входящих и поискового индекса в конце. Тексты и
+названия берутся из пула, заранее сгенерированного Faker: вызов Faker на
+каждую строку стоил бы дороже самой вставки.
+"""
+import random
+from array import array
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from . import importer, thumbnails
+from .models import Post
+
+LOCALE = 'ru_RU'
+USERNAME_PREFIX = 'synthetic'
+GROUP_SLUG_PREFIX = 'synthetic-'
+TEXT_POOL_SIZE = 2000
+IMAGE_POOL_SIZE = 16
+IMAGE_SIZE = (960, 540)
+IMAGE_SHARE = 0.2
+GROUPLESS_SHARE = 0.3
+PERIOD = timedelta(days=730)
+COMMENT_DELAY = timedelta(days=3)
+# Показатели степенных законов: чем больше, тем сильнее перекос к
+# первым рангам.
+AUTHOR_EXPONENT = 1.1
+FOLLOW_EXPONENT = 1.2
+GROUP_EXPONENT = 1.0
+COMMENT_EXPONENT = 0.9
+
+
+class PowerLaw:
+    """Выборка рангов 0..size-1 с вероятностью, пропорциональной 1/(r+1)^s.
+
+    Ранг 0 — самый популярный.
+    """
+
+    def __init__(self, size, exponent, rng):
+        self.population = range(size)
+        self.cum_weights = list(accumulate(
+            1 / (rank + 1) ** exponent for rank in range(size)
+        ))
+        self.rng = rng
+
+    def sample(self, count):
+        return self.rng.choices(
+            self.population, cum_weights=self.cum_weights, k=count
+        )
+
+
+def _scatter(size, rng):
+    """Перестановка рангов в номера без списка на size элементов.
+
+    Умножение на взаимно простое с size число разбрасывает популярные
+    ранги по всей ленте, а не собирает их в её начале.
+    """
+    stride = rng.randrange(1, size) if size > 1 else 1
+    while _gcd(stride, size) != 1:
+        stride += 1
+    return lambda rank: rank * stride % size
+
+
+def _gcd(a, b):
+    while b:
+        a, b = b, a % b
+    return a
+
+
+def _image(rng):
+    """JPEG с градиентом случайных цветов."""
+    start = [rng.randrange(256) for _ in range(3)]
+    end = [rng.randrange(256) for _ in range(3)]
+    width, height = IMAGE_SIZE
+    image = Image.new('RGB', IMAGE_SIZE)
+    for x in range(width):
+        color = tuple(
+            a + (b - a) * x // width for a, b in zip(start, end)
+        )
+        image.paste(color, (x, 0, x + 1, height))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=80)
+    return buffer.getvalue()
+
+
+def save_images(count, rng):
+    """Кладёт пул картинок в хранилище постов и возвращает их имена."""
+    field = Post._meta.get_field('image')
+    return [
+        field.storage.save(
+            field.generate_filename(None, f'synthetic-{number}.jpg'),
+            ContentFile(_image(rng)),
+        )
+        for number in range(count)
+    ]
+
+
+class Generator:
+    """Поток записей: пользователи, группы, посты, комментарии, подписки."""
+
+    def __init__(self, users, groups, posts, comments, follows,
+                 image_share=IMAGE_SHARE, images=(), seed=None):
+        self.rng = random.Random(seed)
+        self.faker = Faker(LOCALE)
+        self.faker.seed_instance(seed)
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follows = follows
+        self.image_share = image_share if images else 0
+        self.images = list(images)
+        self.texts = [
+            self.faker.paragraph(nb_sentences=self.rng.randint(1, 6))
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        self.end = timezone.now()
+        self.start = self.end - PERIOD
+
+    def username(self, number):
+        return f'{USERNAME_PREFIX}{number}'
+
+    def records(self):
+        for number in range(self.users):
+            yield {'type': 'user', 'username': self.username(number)}
+        yield from self.group_records()
+        yield from self.post_records()
+        yield from self.follow_records()
+
+    def group_records(self):
+        for number in range(self.groups):
+            yield {
+                'type': 'group',
+                'slug': f'{GROUP_SLUG_PREFIX}{number}',
+                'title': self.faker.word().capitalize(),
+                'description': self.rng.choice(self.texts),
+            }
+
+    def comment_counts(self):
+        """Число комментариев каждого поста.
+
+        array, а не список: постов могут быть миллионы.
+        """
+        counts = array('L', bytes(array('L').itemsize * self.posts))
+        if not self.posts:
+            return counts
+        position = _scatter(self.posts, self.rng)
+        ranks = PowerLaw(self.posts, COMMENT_EXPONENT, self.rng)
+        remaining = self.comments
+        while remaining:
+            chunk = min(remaining, importer.BATCH_SIZE)
+            for rank in ranks.sample(chunk):
+                counts[position(rank)] += 1
+            remaining -= chunk
+        return counts
+
+    def post_records(self):
+        if not self.posts:
+            return
+        rng = self.rng
+        counts = self.comment_counts()
+        authors = PowerLaw(self.users, AUTHOR_EXPONENT, rng)
+        groups = PowerLaw(self.groups, GROUP_EXPONENT, rng)
+        step = PERIOD / self.posts
+        for number in range(self.posts):
+            pub_date = self.start + step * number
+            group = None
+            if self.groups and rng.random() >= GROUPLESS_SHARE:
+                group = f'{GROUP_SLUG_PREFIX}{groups.sample(1)[0]}'
+            image = ''
+            if rng.random() < self.image_share:
+                image = rng.choice(self.images)
+            yield {
+                'type': 'post',
+                'id': number,
+                'author': self.username(authors.sample(1)[0]),
+                'group': group,
+                'text': rng.choice(self.texts),
+                'pub_date': pub_date.isoformat(),
+                'image': image,
+            }
+            for _ in range(counts[number]):
+                created = min(
+                    pub_date + COMMENT_DELAY * rng.random(), self.end
+                )
+                yield {
+                    'type': 'comment',
+                    'post': number,
+                    'author': self.username(rng.randrange(self.users)),
+                    'text': rng.choice(self.texts),
+                    'created': created.isoformat(),
+                }
+
+    def follow_records(self):
+        """Подписки на популярных авторов; повторы отбрасывает импорт."""
+        if self.users < 2:
+            return
+        authors = PowerLaw(self.users, FOLLOW_EXPONENT, self.rng)
+        remaining = self.follows
+        while remaining:
+            chunk = min(remaining, importer.BATCH_SIZE)
+            for author in authors.sample(chunk):
+                user = self.rng.randrange(self.users - 1)
+                if user >= author:
+                    user += 1
+                yield {
+                    'type': 'follow',
+                    'user': self.username(user),
+                    'author': self.username(author),
+                }
+            remaining -= chunk
+
+
+def run(users, groups, posts, comments, follows, image_share=IMAGE_SHARE,
+        batch_size=importer.BATCH_SIZE, generate_thumbnails=True, seed=None):
+    """Генерирует и записывает данные. Возвращает статистику импорта."""
+    rng = random.Random(seed)
+    images = []
+    if posts and image_share:
+        images = save_images(IMAGE_POOL_SIZE, rng)
+    generator = Generator(
+        users, groups, posts, comments, follows,
+        image_share=image_share, images=images, seed=seed,
+    )
+    # Миниатюры строятся для пула, а не для каждого поста с картинкой:
+    # картинок всего IMAGE_POOL_SIZE.
+    stats = importer.run(
+        generator.records(), batch_size=batch_size,
+        generate_thumbnails=False,
+    )
+    if generate_thumbnails and images:
+        stats['thumbnails'], stats['thumbnail_errors'] = (
+            thumbnails.generate_many(images)
+        )
+    return stats
@@ -0,0 +1,46 @@
+from django import template
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts import caching
+
+register = template.Library()
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+CARD_TEMPLATE = 'includes/article.html'
+
+
+def card_cache_key(post, show_author, show_group):
+    """Ключ карточки: id поста, его версия, версии автора и группы, флаги.
+
+    Пост, прочитанный с отстающей реплики, может быть старше своей
+    версии. Поэтому в ключе есть база, из которой он прочитан, а у
+    такой карточки ещё и поколение реплик: она живёт до их обновления и
+    не достаётся тем, кто читает основную базу.
+    """
+    keys = [
+        caching.post_key(post.pk),
+        caching.user_key(post.author_id),
+        caching.group_id_key(post.group_id),
+    ]
+    if post._state.db != DEFAULT_DB_ALIAS:
+        keys.append(caching.REPLICAS)
+    version = caching.generation(*keys)
+    flags = f'{int(show_author)}{int(show_group)}'
+    return f'card:{post.pk}:{flags}:{post._state.db}:{version}'
+
+
+@register.simple_tag
+def post_card(post, show_author=True, show_group=True):
+    """Карточка поста, общая для всех лент и закэшированная целиком."""
+    key = card_cache_key(post, show_author, show_group)
+    card = cache.get(key)
+    if card is None:
+        card = render_to_string(CARD_TEMPLATE, {
+            'post': post,
+            'show_author': show_author,
+            'show_group': show_group,
+        })
+        cache.set(key, card, CARD_CACHE_TIMEOUT)
+    return mark_safe(card)
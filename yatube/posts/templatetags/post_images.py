@@ -0,0 +1,14 @@
+from django import template
+
+from posts.thumbnails import responsive_image
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/picture.html')
+def post_picture(image, sizes='100vw'):
+    """<picture> с WebP и srcset вместо одной обрезки 960x339."""
+    return {
+        'image': responsive_image(image) if image else None,
+        'sizes': sizes,
+    }
@@ -0,0 +1,112 @@
+import csv
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..paginators import EstimatedCountPaginator
+
+User = get_user_model()
+
+
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {number}', slug=f'group-{number}'
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def create_posts(self, count):
+        start = Post.objects.count()
+        for number in range(start, start + count):
+            author = User.objects.create_user(username=f'author-{number}')
+            Post.objects.create(
+                author=author,
+                text=f'Пост {number}',
+                group=self.groups[number % len(self.groups)],
+            )
+
+    def changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Строки списка не добавляют запросов к авторам и группам."""
+        self.create_posts(2)
+        few = self.changelist_queries()
+        self.create_posts(8)
+        self.assertEqual(self.changelist_queries(), few)
+
+    def test_large_unfiltered_list_uses_estimate(self):
+        self.create_posts(3)
+        queryset = Post.objects.order_by('-pk')
+        paginator = EstimatedCountPaginator(queryset, 10)
+        paginator.exact_count_limit = 1
+        max_pk = queryset.values_list('pk', flat=True)[0]
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(paginator.count, max_pk)
+        self.assertNotIn('COUNT', queries[0]['sql'])
+
+        filtered = EstimatedCountPaginator(
+            queryset.filter(group=self.groups[0]), 10
+        )
+        filtered.exact_count_limit = 1
+        self.assertEqual(filtered.count, 1)
+
+    def test_change_form_uses_autocomplete(self):
+        self.create_posts(1)
+        post = Post.objects.get()
+        response = self.client.get(
+            reverse('admin:posts_post_change', args=(post.pk,))
+        )
+        self.assertContains(response, 'data-ajax--url', count=2)
+
+    def test_export_action_streams_posts_with_comments(self):
+        self.create_posts(2)
+        post = Post.objects.order_by('pk').first()
+        Comment.objects.create(post=post, author=self.admin, text='Отзыв')
+        response = self.client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'export_jsonl',
+            '_selected_action': [post.pk],
+        })
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        records = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [(record['type'], record['text']) for record in records],
+            [('post', post.text), ('comment', 'Отзыв')],
+        )
+
+    def test_export_action_streams_follows(self):
+        self.create_posts(1)
+        author = User.objects.get(username='author-0')
+        follow = Follow.objects.create(user=self.admin, author=author)
+        response = self.client.post(reverse('admin:posts_follow_changelist'), {
+            'action': 'export_csv',
+            '_selected_action': [follow.pk],
+        })
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        [record] = csv.DictReader(lines)
+        self.assertEqual(
+            (record['type'], record['user'], record['author']),
+            ('follow', 'admin', 'author-0'),
+        )
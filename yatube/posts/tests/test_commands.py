@@ -0,0 +1,302 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from .. import query_plans, search
+from ..models import Comment, Follow, Group, InboxEntry, Post, UserStats
+
+User = get_user_model()
+
+
+class RebuildInboxesCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def test_rebuild_inboxes_restores_entries(self):
+        """Команда rebuild_inboxes заново раздаёт посты подписчикам."""
+        InboxEntry.objects.all().delete()
+        call_command('rebuild_inboxes', stdout=StringIO())
+        self.assertTrue(
+            InboxEntry.objects.filter(user=self.user, post=self.post).exists()
+        )
+
+
+class ReconcileCountersCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        Comment.objects.create(post=cls.post, author=cls.user, text='Ком')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def test_reconcile_counters_repairs_drift(self):
+        """Команда reconcile_counters чинит разошедшиеся счётчики."""
+        UserStats.objects.filter(user=self.author).update(
+            posts_count=10, followers_count=0
+        )
+        UserStats.objects.filter(user=self.user).delete()
+        Post.objects.filter(pk=self.post.pk).update(comments_count=5)
+
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+
+        author_stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 1
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+
+class ImportContentCommandTest(TestCase):
+    records = [
+        {'type': 'group', 'slug': 'cats', 'title': 'Коты'},
+        {'type': 'follow', 'user': 'reader', 'author': 'author'},
+        {
+            'type': 'post', 'id': 'p1', 'author': 'author', 'group': 'cats',
+            'text': 'Первый импортированный пост',
+            'pub_date': '2020-01-02T03:04:05+00:00',
+        },
+        {'type': 'post', 'id': 'p2', 'author': 'author', 'text': 'Второй'},
+        {
+            'type': 'comment', 'post': 'p1', 'author': 'reader',
+            'text': 'Комментарий',
+        },
+        {'type': 'comment', 'post': 'missing', 'author': 'reader',
+         'text': 'Потерянный'},
+        {'type': 'post', 'id': 'p3', 'author': 'author', 'group': 'dogs',
+         'text': 'Без группы'},
+    ]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def import_file(self, path, **options):
+        stderr = StringIO()
+        call_command(
+            'import_content', path, batch_size=2, skip_thumbnails=True,
+            stdout=StringIO(), stderr=stderr, **options
+        )
+        return stderr.getvalue()
+
+    def test_import_jsonl_and_rebuild_derived_data(self):
+        """Импорт пишет записи пачками и пересчитывает производные данные."""
+        lines = [json.dumps(record) for record in self.records]
+        lines.insert(1, '{broken')
+        errors = self.import_file(self.write('data.jsonl', '\n'.join(lines)))
+
+        self.assertEqual(errors.count('Запись'), 3)
+        author = User.objects.get(username='author')
+        reader = User.objects.get(username='reader')
+        post = Post.objects.get(text='Первый импортированный пост')
+        self.assertEqual(post.group, Group.objects.get(slug='cats'))
+        self.assertEqual(
+            post.pub_date, datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        )
+        self.assertEqual(post.comments_count, 1)
+        self.assertTrue(Follow.objects.filter(
+            user=reader, author=author
+        ).exists())
+        self.assertEqual(UserStats.objects.get(user=author).posts_count, 2)
+        self.assertEqual(InboxEntry.objects.filter(user=reader).count(), 2)
+        self.assertEqual(
+            list(search.matching(Post.objects.all(), 'импортированные')),
+            [post],
+        )
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+
+    def test_malformed_records_are_skipped(self):
+        """Запись не того вида пропускается, остальные импортируются."""
+        lines = [
+            '[1, 2]',
+            '"строка"',
+            json.dumps({'type': 'post', 'id': 'p1', 'author': 'author',
+                        'text': 'Дата', 'pub_date': '2024-13-45T10:00:00'}),
+            json.dumps({'type': 'post', 'id': 'p2', 'author': 'author',
+                        'text': 'Группа', 'group': ['cats']}),
+            json.dumps({'type': 'post', 'id': 'p3', 'author': 'author',
+                        'text': 'Целый пост'}),
+        ]
+        errors = self.import_file(self.write('data.jsonl', '\n'.join(lines)))
+
+        self.assertEqual(errors.count('Запись'), 4)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Целый пост']
+        )
+
+    def test_import_csv(self):
+        content = (
+            'type,id,slug,title,author,group,text,post,user\n'
+            'group,,cats,Коты,,,,,\n'
+            'post,p1,,,author,cats,Пост из CSV,,\n'
+            'comment,,,,reader,,Комментарий,p1,\n'
+        )
+        self.assertEqual(self.import_file(self.write('data.csv', content)), '')
+        post = Post.objects.get(text='Пост из CSV')
+        self.assertEqual(post.group.slug, 'cats')
+        self.assertEqual(post.comments.get().author.username, 'reader')
+
+
+class ExportContentCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Коты', slug='cats')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост с группой'
+        )
+        Post.objects.create(author=cls.author, text='Пост без группы')
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def export(self, *args, **options):
+        stdout = StringIO()
+        call_command('export_content', *args, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_export_jsonl_to_stdout(self):
+        records = [
+            json.loads(line) for line in self.export().splitlines()
+        ]
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['group', 'post', 'post', 'comment', 'follow'],
+        )
+        self.assertEqual(records[1]['group'], 'cats')
+        self.assertEqual(records[3]['post'], self.post.pk)
+
+    def test_export_csv_selected_types(self):
+        lines = self.export(
+            format='csv', types=['post']
+        ).splitlines()
+        self.assertTrue(lines[0].startswith('type,id,'))
+        self.assertEqual(len(lines), 3)
+
+    def test_export_then_import_restores_content(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'dump.jsonl')
+        self.export(path)
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        Follow.objects.all().delete()
+
+        call_command(
+            'import_content', path, skip_thumbnails=True,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+        post = Post.objects.get(text='Пост с группой')
+        self.assertEqual(post.group.slug, 'cats')
+        self.assertEqual(post.comments.get().author, self.reader)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class SeedContentCommandTest(TestCase):
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def seed(self, **options):
+        call_command(
+            'seed_content', users=50, groups=5, posts=300, comments=600,
+            follows=400, image_share=0.5, seed=1, skip_thumbnails=True,
+            stdout=StringIO(), **options
+        )
+
+    def test_seed_creates_skewed_dataset(self):
+        """Немногие авторы собирают большую часть подписок и постов."""
+        self.seed()
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Group.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 600)
+        self.assertGreater(Follow.objects.count(), 200)
+        followers = list(UserStats.objects.order_by(
+            '-followers_count'
+        ).values_list('followers_count', flat=True))
+        self.assertGreater(sum(followers[:5]), sum(followers[25:]))
+        posts = list(UserStats.objects.order_by(
+            '-posts_count'
+        ).values_list('posts_count', flat=True))
+        self.assertGreater(sum(posts[:5]), sum(posts) // 2)
+        with_image = Post.objects.exclude(image='').count()
+        self.assertTrue(100 < with_image < 200)
+        self.assertTrue(all(
+            os.path.exists(os.path.join(settings.MEDIA_ROOT, name))
+            for name in Post.objects.exclude(
+                image=''
+            ).values_list('image', flat=True).distinct()
+        ))
+        self.assertEqual(
+            sum(Post.objects.values_list('comments_count', flat=True)), 600
+        )
+
+    def test_seed_is_reproducible(self):
+        self.seed()
+        first = list(Post.objects.values_list('author__username', 'text'))
+        Post.objects.all().delete()
+        self.seed()
+        second = list(Post.objects.values_list('author__username', 'text'))
+        self.assertEqual(first, second)
+
+
+class IndexAdvisorCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='author')
+        group = Group.objects.create(title='Группа', slug='group')
+        post = Post.objects.create(author=author, group=group, text='Пост')
+        Comment.objects.create(post=post, author=author, text='Отзыв')
+
+    def test_feeds_use_indexes_for_filter_and_order(self):
+        replays = {replay.name: replay for replay in query_plans.replay()}
+        for name in ('index', 'group', 'profile', 'comments'):
+            for page in (name, f'{name} (after)'):
+                with self.subTest(page=page):
+                    self.assertEqual(replays[page].problems, [])
+        for page in ('follow: ключи', 'follow (after): ключи'):
+            with self.subTest(page=page):
+                self.assertEqual(replays[page].problems, [])
+
+    def test_problems_are_reported(self):
+        self.assertEqual(len(query_plans.problems([
+            'SCAN posts_post',
+            'SCAN posts_post USING INDEX post_pub_date',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ])), 2)
+        stdout = StringIO()
+        call_command('index_advisor', stdout=stdout)
+        self.assertIn('index: OK', stdout.getvalue())
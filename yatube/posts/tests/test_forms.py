@@ -1,12 +1,18 @@
+import hashlib
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image, ImageFile
 
+from .. import images
+from ..forms import PostForm
 from ..models import Comment, Group, Post
 
 User = get_user_model()
@@ -64,6 +70,8 @@ class PostFormTests(TestCase):
                 'posts:profile', kwargs={'username': self.user.username}
             ), 2],
         }
+        digest = hashlib.sha256(self.small_gif).hexdigest()
+        image_name = f'posts/{digest[:2]}/{digest[2:4]}/{digest}.gif'
         for form_url, (redic_url, count) in form_urls.items():
             with self.subTest(form_url):
                 uploaded = SimpleUploadedFile(
@@ -82,7 +90,7 @@ class PostFormTests(TestCase):
                     Post.objects.filter(
                         group=self.group,
                         text=self.form_data['text'],
-                        image='posts/gif_image.gif'
+                        image=image_name
                     ).exists()
                 )
 
@@ -166,3 +174,71 @@ class PostFormTests(TestCase):
             response.context['post'].comments.all()[0].text,
             self.form_comment_data['text']
         )
+
+
+def image_upload(size, image_format='JPEG', exif=None, name='photo.jpg'):
+    buffer = BytesIO()
+    options = {'exif': exif.tobytes()} if exif is not None else {}
+    Image.new('RGB', size, 'red').save(buffer, image_format, **options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImageIngestTests(TestCase):
+    def form(self, upload):
+        return PostForm(data={'text': 'Пост'}, files={'image': upload})
+
+    def stored_image(self, form):
+        self.assertTrue(form.is_valid(), form.errors)
+        image = Image.open(form.cleaned_data['image'])
+        image.load()
+        return image
+
+    def test_small_image_is_kept_as_is(self):
+        upload = image_upload((10, 10), 'PNG', name='small.png')
+        form = self.form(upload)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertIs(form.cleaned_data['image'], upload)
+
+    def test_large_image_is_downscaled(self):
+        with mock.patch.object(images, 'MAX_SIDE', 100):
+            image = self.stored_image(self.form(image_upload((400, 200))))
+        self.assertEqual(image.size, (100, 50))
+        self.assertEqual(image.format, 'JPEG')
+
+    def test_exif_is_stripped_and_orientation_applied(self):
+        exif = Image.Exif()
+        exif[images.EXIF_ORIENTATION] = 6
+        image = self.stored_image(self.form(image_upload((40, 20), exif=exif)))
+        self.assertEqual(image.size, (20, 40))
+        self.assertNotIn('exif', image.info)
+
+    def test_limits_are_checked_before_decoding(self):
+        cases = {
+            'MAX_PIXELS': 'too_many_pixels',
+            'MAX_UPLOAD_SIZE': 'file_too_large',
+        }
+        for limit, code in cases.items():
+            upload = image_upload((40, 20))
+            with self.subTest(limit), mock.patch.object(images, limit, 10):
+                with mock.patch.object(ImageFile.ImageFile, 'load') as load:
+                    form = self.form(upload)
+                    self.assertFalse(form.is_valid())
+                load.assert_not_called()
+                self.assertTrue(form.has_error('image', code))
+
+    def test_truncated_image_is_rejected(self):
+        upload = image_upload((400, 200))
+        content = upload.read()
+        truncated = SimpleUploadedFile(
+            'photo.jpg', content[:len(content) // 2]
+        )
+        with mock.patch.object(images, 'MAX_SIDE', 100):
+            form = self.form(truncated)
+            self.assertFalse(form.is_valid())
+        self.assertTrue(form.has_error('image', 'invalid_image'))
+
+    def test_unsupported_format_is_rejected(self):
+        form = self.form(image_upload((10, 10), 'BMP', name='image.bmp'))
+        self.assertFalse(form.is_valid())
+        self.assertTrue(form.has_error('image', 'invalid_format'))
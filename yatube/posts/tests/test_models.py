@@ -1,7 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-from ..models import SLICE_SIZE, Comment, Follow, Group, Post
+from ..models import SLICE_SIZE, Comment, Follow, Group, Post, UserStats
 
 User = get_user_model()
 
@@ -73,3 +75,49 @@ class PostModelTest(TestCase):
         self.assertTrue(
             Follow.objects.get(user=self.user, author=self.author)
         )
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.author = User.objects.create_user(username='author')
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Комментарий'
+        )
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        post.refresh_from_db()
+        author_stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 1
+        )
+
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        author_stats.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(author_stats.followers_count, 0)
+
+    def test_post_delete_does_not_recount_each_comment(self):
+        """Удаление поста не трогает счётчик за каждый комментарий."""
+        counts = []
+        for comments in (1, 5):
+            post = Post.objects.create(author=self.author, text='Пост')
+            for number in range(comments):
+                Comment.objects.create(
+                    post=post, author=self.user, text=f'Комментарий {number}'
+                )
+            with CaptureQueriesContext(connection) as queries:
+                post.delete()
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertFalse(Comment.objects.exists())
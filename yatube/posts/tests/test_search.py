@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Post
+
+User = get_user_model()
+
+
+def found(query):
+    return set(
+        search.matching(Post.objects.all(), query).values_list(
+            'text', flat=True
+        )
+    )
+
+
+class SearchIndexTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.user, text='Кот спит на солнце')
+        Post.objects.create(author=cls.user, text='Котов кормят рыбой')
+        Post.objects.create(author=cls.user, text='Ёжик в тумане')
+
+    def test_word_forms_match_by_stem(self):
+        """Разные формы слова находят друг друга."""
+        self.assertEqual(
+            found('котами'), {'Кот спит на солнце', 'Котов кормят рыбой'}
+        )
+        self.assertEqual(found('ежики'), {'Ёжик в тумане'})
+        self.assertEqual(found('кот солнцем'), {'Кот спит на солнце'})
+
+    def test_query_syntax_is_not_interpreted(self):
+        """Операторы FTS5 во вводе пользователя не ломают запрос."""
+        for query in ('кот OR', '"кот', 'NEAR(кот', '*', '---'):
+            with self.subTest(query=query):
+                list(search.matching(Post.objects.all(), query))
+        self.assertEqual(found('   '), set())
+
+    def test_index_follows_bulk_writes(self):
+        """Триггеры обновляют индекс и при записи в обход сигналов."""
+        Post.objects.bulk_create([Post(author=self.user, text='Собака')])
+        self.assertEqual(found('собаки'), {'Собака'})
+        Post.objects.filter(text='Собака').update(text='Попугай')
+        self.assertEqual(found('собака'), set())
+        self.assertEqual(found('попугай'), {'Попугай'})
+        Post.objects.filter(text='Попугай').delete()
+        self.assertEqual(found('попугай'), set())
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.best = Post.objects.create(
+            author=cls.user, text='Кот, кот и ещё раз кот'
+        )
+        for number in range(12):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Пост {number} про кота и много других слов',
+            )
+        Post.objects.create(author=cls.user, text='Про собак')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_results_are_ranked_and_paginated_by_cursor(self):
+        url = reverse('posts:post_search')
+        response = self.client.get(url, {'q': 'кот'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj[0], self.best)
+        self.assertEqual(len(page_obj), 10)
+        self.assertContains(response, 'q=%D0%BA%D0%BE%D1%82&amp;after=')
+
+        response = self.client.get(
+            url, {'q': 'кот', 'after': page_obj.paginator.next_cursor}
+        )
+        next_page = response.context['page_obj']
+        self.assertEqual(len(next_page), 3)
+        self.assertFalse(set(page_obj) & set(next_page))
+
+    def test_empty_query_finds_nothing(self):
+        response = self.client.get(reverse('posts:post_search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собаками'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            list(Post.objects.filter(text='Про собак')),
+        )
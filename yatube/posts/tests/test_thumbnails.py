@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_upload(name='image.png', size=(50, 50)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (255, 0, 0)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_generate_builds_thumbnails(self):
+        """generate строит миниатюры, которые затем берёт шаблон."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=image_upload()
+        )
+        self.assertIsNone(thumbnails.generate(post.image.name))
+        self.assertTrue(
+            os.listdir(os.path.join(TEMP_MEDIA_ROOT, 'cache'))
+        )
+
+    def test_post_image_has_responsive_variants(self):
+        """Картинка выводится с WebP, srcset и явными размерами."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=image_upload(size=(800, 600))
+        )
+        thumbnails.generate(post.image.name)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, '.webp 480w')
+        self.assertContains(response, '.png 960w')
+        self.assertContains(response, 'width="960"')
+        self.assertContains(response, 'height="339"')
+
+    def test_render_does_not_build_thumbnails(self):
+        """Без готовых миниатюр выводится исходник, а сборка — в очереди."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=image_upload(size=(800, 600))
+        )
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        with mock.patch.object(thumbnails, 'get_thumbnail') as get_thumbnail:
+            with mock.patch.object(thumbnails, 'schedule') as schedule:
+                response = self.authorized_client.get(url)
+                self.authorized_client.get(reverse('posts:index'))
+        get_thumbnail.assert_not_called()
+        schedule.assert_called_once_with(post.image.name)
+        self.assertContains(response, post.image.url)
+        self.assertNotContains(response, 'type="image/webp"')
+
+        thumbnails.generate(post.image.name)
+        self.assertContains(
+            self.authorized_client.get(url), 'type="image/webp"'
+        )
+        self.assertContains(
+            self.authorized_client.get(reverse('posts:index')), '.webp 480w'
+        )
+
+    def test_generate_reports_broken_image(self):
+        self.assertIsNotNone(thumbnails.generate('posts/missing.png'))
+
+    def test_post_create_schedules_thumbnails(self):
+        """Пост с картинкой из формы ставит миниатюры в очередь."""
+        with mock.patch.object(thumbnails, 'pregenerate') as pregenerate:
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                data={'text': 'Пост с картинкой', 'image': image_upload()},
+            )
+        pregenerate.assert_called_once_with(Post.objects.get())
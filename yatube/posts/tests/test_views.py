@@ -1,17 +1,22 @@
 import shutil
 import tempfile
-from datetime import datetime
+from datetime import datetime, timedelta
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Comment, Follow, Group, Post
-from ..views import POSTS_ON_PAGE
+from .. import caching, timeline
+from ..models import Comment, Follow, Group, InboxEntry, Post
+from ..paginators import encode_cursor
+from ..views import COMMENTS_ON_PAGE, POSTS_ON_PAGE
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -186,24 +191,124 @@ class PostsViewsTests(PostSetUpTestCase):
         response = self.authorized_client.get(reverse_name)
         self.assertFalse(self.post in response.context['page_obj'])
 
+    def test_feeds_query_count_does_not_depend_on_authors(self):
+        """Карточки постов не делают запросов на автора и группу"""
+        follower = User.objects.create_user(username='follower')
+        client = Client()
+        client.force_login(follower)
+        Follow.objects.create(user=follower, author=self.user)
+        urls = self.pages_with_posts + [reverse('posts:follow_index')]
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                with CaptureQueriesContext(connection) as one_author:
+                    client.get(url)
+                for i in range(POSTS_ON_PAGE):
+                    author = User.objects.create_user(username=f'a{i}')
+                    Follow.objects.get_or_create(user=follower, author=author)
+                    Post.objects.create(
+                        author=author, text='Пост', group=self.group
+                    )
+                cache.clear()
+                with CaptureQueriesContext(connection) as many_authors:
+                    client.get(url)
+                self.assertEqual(
+                    len(one_author.captured_queries),
+                    len(many_authors.captured_queries)
+                )
+                Post.objects.filter(author__username__startswith='a').delete()
+                User.objects.filter(username__startswith='a').delete()
+
     def test_posts_index_cache(self):
+        """Главная страница кэшируется до записи, меняющей ленту."""
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Мимо сигналов')
+        content_from_cache = self.authorized_client.get(url).content
+        self.assertIn(self.post.text.encode(), content_from_cache)
+
         post_2 = Post.objects.create(
             author=self.user,
             text='Тестовыйddddddd пост 2',
             group=self.group,
         )
-        self.authorized_client.get(reverse('posts:index'))
+        content_after_create = self.authorized_client.get(url).content
+        self.assertIn(post_2.text.encode(), content_after_create)
+
         post_2.delete()
-        content_after_delete = self.authorized_client.get(
-            reverse('posts:index')).content
+        content_after_delete = self.authorized_client.get(url).content
+        self.assertNotIn(post_2.text.encode(), content_after_delete)
+
+    def test_feed_caches_are_invalidated_by_writes(self):
+        """Запись в Post, Group и Comment сбрасывает кэш затронутых лент."""
+        follower = User.objects.create_user(username='follower')
+        client = Client()
+        client.force_login(follower)
+        Follow.objects.create(user=follower, author=self.user)
+        urls = self.pages_with_posts + [reverse('posts:follow_index')]
+        for url in urls:
+            client.get(url)
 
-        self.assertIn(post_2.text.encode(), content_after_delete)
-        self.assertEqual(Post.objects.all().count(), 1)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Отредактированный пост'
+        post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIn(post.text.encode(), client.get(url).content)
 
-        cache.clear()
-        content_after_clear_cache = self.authorized_client.get(
-            reverse('posts:index')).content
-        self.assertNotIn(post_2.text.encode(), content_after_clear_cache)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'new-slug'
+        group.save()
+        self.assertIn(b'/group/new-slug/', client.get(urls[0]).content)
+
+        post_detail = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+        generation = caching.generation(caching.post_key(self.post.pk))
+        Comment.objects.create(post=self.post, author=follower, text='Ещё')
+        self.assertNotEqual(
+            generation, caching.generation(caching.post_key(self.post.pk))
+        )
+        self.assertContains(client.get(post_detail), 'Ещё')
+
+    def test_author_writes_do_not_bump_follower_feeds(self):
+        """Пост автора меняет его поколение, а не поколения подписчиков."""
+        follower = User.objects.create_user(username='follower')
+        client = Client()
+        client.force_login(follower)
+        Follow.objects.create(user=follower, author=self.user)
+        url = reverse('posts:follow_index')
+        client.get(url)
+        follow_generation = caching.generation(caching.follow_key(follower.pk))
+
+        post = Post.objects.create(author=self.user, text='Новый пост')
+        Comment.objects.create(post=post, author=follower, text='Отзыв')
+
+        self.assertEqual(
+            follow_generation,
+            caching.generation(caching.follow_key(follower.pk)),
+        )
+        self.assertContains(client.get(url), 'Новый пост')
+
+    def test_post_card_is_shared_between_feeds(self):
+        """Карточка поста рендерится один раз и сбрасывается при правках."""
+        follower = User.objects.create_user(username='follower')
+        client = Client()
+        client.force_login(follower)
+        Follow.objects.create(user=follower, author=self.user)
+        client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='Мимо сигналов')
+        self.assertContains(
+            client.get(reverse('posts:follow_index')), self.post.text
+        )
+
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = 'Лев'
+        author.last_name = 'Толстой'
+        author.save()
+        response = client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'Лев Толстой')
+        self.assertContains(response, 'Мимо сигналов')
 
 
 class PaginatorViewsTest(PostSetUpTestCase):
@@ -248,6 +353,41 @@ class PaginatorViewsTest(PostSetUpTestCase):
                     len(response.context['page_obj']), count_posts
                 )
 
+    def test_cursor_paginator(self):
+        """Курсорный паджинатор листает ленту вперёд и назад"""
+        url = reverse('posts:index')
+        first_page = self.guest_client.get(url).context['page_obj']
+        self.assertTrue(first_page.paginator.has_next)
+        self.assertFalse(first_page.paginator.has_previous)
+
+        second_page = self.guest_client.get(
+            url, {'after': first_page.paginator.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second_page), 7)
+        self.assertFalse(second_page.paginator.has_next)
+        self.assertTrue(second_page.paginator.has_previous)
+        self.assertFalse(set(first_page) & set(second_page))
+
+        back_page = self.guest_client.get(
+            url, {'before': second_page.paginator.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+
+    def test_cursor_paginator_ignores_broken_cursor(self):
+        """Битый курсор открывает первую страницу"""
+        response = self.guest_client.get(
+            reverse('posts:index'), {'after': 'не-курсор'}
+        )
+        self.assertEqual(len(response.context['page_obj']), POSTS_ON_PAGE)
+
+    def test_cursor_paginator_ignores_impossible_date(self):
+        """Курсор с несуществующей датой открывает первую страницу"""
+        cursor = encode_cursor(['2024-13-45T10:00:00+00:00', 5])
+        for url in (reverse('posts:index'), reverse('api_v1:index')):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, {'after': cursor})
+                self.assertEqual(response.status_code, 200)
+
 
 class PostsViewsImageTestCase(PostSetUpTestCase):
     @classmethod
@@ -347,3 +487,213 @@ class PostsFollowTestCase(PostSetUpTestCase):
         self.assertFalse(
             response.context['page_obj']
         )
+
+    def test_new_author_post_is_fanned_out_to_followers(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Свежий пост')
+
+        self.assertTrue(
+            InboxEntry.objects.filter(user=self.user, post=post).exists()
+        )
+
+    def test_follow_backfills_and_unfollow_prunes_inbox(self):
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': self.author})
+        )
+        self.assertEqual(
+            InboxEntry.objects.filter(user=self.user).count(), 2
+        )
+
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': self.author})
+        )
+        self.assertFalse(InboxEntry.objects.filter(user=self.user).exists())
+
+    def test_celebrity_posts_are_merged_on_read(self):
+        cache.clear()
+        with mock.patch.object(timeline, 'FANOUT_LIMIT', 0):
+            Follow.objects.create(user=self.user, author=self.author)
+            response = self.authorized_client.get(
+                reverse('posts:follow_index')
+            )
+        cache.clear()
+
+        self.assertFalse(InboxEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.new_author_post, self.post_author]
+        )
+
+    def test_follow_feed_pages_merge_inbox_and_celebrities(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        celebrity = User.objects.create_user(username='celebrity')
+        for number in range(POSTS_ON_PAGE):
+            Post.objects.create(author=celebrity, text=f'Пост {number}')
+        cache.clear()
+        expected = list(
+            Post.objects.filter(
+                author__in=[self.author, celebrity]
+            ).order_by('-pub_date', '-pk')
+        )
+        url = reverse('posts:follow_index')
+        with mock.patch.object(timeline, 'FANOUT_LIMIT', 0):
+            Follow.objects.create(user=self.user, author=celebrity)
+            first_page = self.authorized_client.get(url).context['page_obj']
+            second_page = self.authorized_client.get(
+                url, {'after': first_page.paginator.next_cursor}
+            ).context['page_obj']
+        cache.clear()
+
+        self.assertEqual(
+            list(first_page) + list(second_page), expected
+        )
+        self.assertFalse(second_page.paginator.has_next)
+
+    def test_demoted_author_posts_are_fanned_out(self):
+        other = User.objects.create_user(username='other')
+        cache.clear()
+        with mock.patch.object(timeline, 'FANOUT_LIMIT', 1):
+            Follow.objects.create(user=self.user, author=self.author)
+            Follow.objects.create(user=other, author=self.author)
+            cache.clear()
+            post = Post.objects.create(author=self.author, text='Свежий пост')
+            self.assertFalse(InboxEntry.objects.filter(post=post).exists())
+
+            Follow.objects.filter(user=other).delete()
+        cache.clear()
+
+        self.assertEqual(
+            set(InboxEntry.objects.filter(
+                user=self.user
+            ).values_list('post', flat=True)),
+            set(Post.objects.filter(
+                author=self.author
+            ).values_list('pk', flat=True)),
+        )
+
+
+class PostCommentsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def add_comments(self, count):
+        start = Comment.objects.count()
+        for number in range(start, start + count):
+            Comment.objects.create(
+                post=self.post,
+                author=User.objects.create_user(username=f'reader-{number}'),
+                text=f'Комментарий {number}',
+            )
+
+    def detail_queries(self):
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return len(queries)
+
+    def test_comment_authors_are_loaded_in_bulk(self):
+        """Число запросов не зависит от числа комментариев."""
+        self.add_comments(2)
+        few = self.detail_queries()
+        self.add_comments(5)
+        self.assertEqual(self.detail_queries(), few)
+
+    def test_comments_are_paginated_by_cursor(self):
+        self.add_comments(COMMENTS_ON_PAGE + 3)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_ON_PAGE)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertContains(response, 'data-comments-more')
+
+        response = self.client.get(
+            reverse('posts:post_comments', args=(self.post.pk,)),
+            {'after': comments.paginator.next_cursor},
+        )
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            [f'Комментарий {number}' for number in range(
+                COMMENTS_ON_PAGE, COMMENTS_ON_PAGE + 3
+            )],
+        )
+        self.assertNotContains(response, 'data-comments-more')
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_pages_answer_not_modified(self):
+        """Повторный запрос с ETag получает 304 без рендера страницы."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('no-cache', response['Cache-Control'])
+                etag = response['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+
+                Post.objects.create(
+                    author=self.author, text='Новый', group=self.group
+                )
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_detail_last_modified_follows_comments(self):
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        with mock.patch('django.utils.timezone.now') as now:
+            now.return_value = self.post.updated + timedelta(minutes=1)
+            Comment.objects.create(
+                post=self.post, author=self.author, text='Комментарий'
+            )
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['Last-Modified'], last_modified)
+
+    def test_post_detail_etag_changes_with_csrf_token(self):
+        """После повторного входа форма комментария получает новый токен."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.client.force_login(self.author)
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        self.client.logout()
+        self.client.force_login(self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_viewers_get_different_etags(self):
+        url = reverse('posts:index')
+        guest_etag = self.client.get(url)['ETag']
+        self.client.force_login(self.author)
+        self.assertNotEqual(self.client.get(url)['ETag'], guest_etag)
@@ -0,0 +1,168 @@
+"""Миниатюры картинок постов.
+
+Каждая картинка нарезается в несколько ширин, в WebP и в формате
+исходника, чтобы браузер по srcset/sizes выбрал самый лёгкий вариант.
+
+sorl-thumbnail создаёт миниатюру лениво, при первом рендере шаблона, и
+декодирование исходника оплачивает первый посетитель страницы. Здесь
+миниатюры строятся в фоновом пуле процессов сразу после сохранения
+поста, а команда generate_thumbnails догоняет уже загруженные картинки.
+
+Построенные варианты (адреса и размеры) кладутся в кэш по имени
+картинки. Шаблон только читает их оттуда; если их ещё нет, выводится
+исходная картинка, а построение ставится в очередь. Когда варианты
+готовы, ленты с постами этой картинки сбрасываются.
+"""
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+from sorl.thumbnail import get_thumbnail
+
+from . import caching
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+ASPECT_RATIO = (960, 339)
+WIDTHS = (480, 720, 960)
+# None — формат исходника (settings.THUMBNAIL_PRESERVE_FORMAT).
+FORMATS = (None, 'WEBP')
+
+
+def _spec(width, image_format):
+    height = round(width * ASPECT_RATIO[1] / ASPECT_RATIO[0])
+    options = {'crop': 'center', 'upscale': True}
+    if image_format:
+        options['format'] = image_format
+    return f'{width}x{height}', options
+
+
+# Геометрия и параметры определяют имя файла миниатюры в хранилище,
+# поэтому шаблоны и фоновая генерация берут их из одного места.
+THUMBNAIL_SPECS = tuple(
+    _spec(width, image_format)
+    for width in WIDTHS
+    for image_format in FORMATS
+)
+WORKERS = 2
+VARIANTS_KEY = 'thumbnails:{}'
+# Метка «картинку уже выводили без миниатюр»: после построения ленты с
+# ней надо сбросить. Живёт, пока задача может стоять в очереди.
+PENDING_KEY = 'thumbnails:pending:{}'
+PENDING_TIMEOUT = 60 * 10
+
+_executor = None
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def get_executor(workers=WORKERS):
+    """Пул процессов. spawn, а не fork: соединения с базой не наследуются."""
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context('spawn'),
+        initializer=_init_worker,
+    )
+
+
+def generate(name):
+    """Строит все миниатюры картинки. Возвращает текст ошибки или None."""
+    if not default_storage.exists(name):
+        logger.warning('Картинка %s не найдена в хранилище', name)
+        return 'Файл не найден'
+    try:
+        srcsets = {image_format: [] for image_format in FORMATS}
+        for geometry, options in THUMBNAIL_SPECS:
+            thumbnail = get_thumbnail(name, geometry, **options)
+            if not thumbnail.size:
+                return 'Миниатюра не построена'
+            srcsets[options.get('format')].append(thumbnail)
+    except Exception as error:
+        logger.warning('Не удалось построить миниатюры %s: %s', name, error)
+        return str(error)
+    _publish(name, srcsets)
+    return None
+
+
+def _publish(name, srcsets):
+    fallback = srcsets[None][-1]
+    cache.set(VARIANTS_KEY.format(name), {
+        'src': {
+            'url': fallback.url,
+            'width': fallback.width,
+            'height': fallback.height,
+        },
+        'srcset': _srcset(srcsets[None]),
+        'webp_srcset': _srcset(srcsets['WEBP']),
+    }, None)
+    if cache.get(PENDING_KEY.format(name)):
+        # Страницы с исходной картинкой вместо миниатюр уже в кэше.
+        for post in Post.objects.filter(image=name).only(
+            'pk', 'author_id', 'group_id'
+        ):
+            caching.invalidate_post(post)
+        cache.delete(PENDING_KEY.format(name))
+
+
+def generate_many(names, workers=WORKERS, chunk_size=16):
+    """Строит миниатюры картинок в пуле. Возвращает (успешно, с ошибкой)."""
+    done = failed = 0
+    with get_executor(workers) as executor:
+        for error in executor.map(generate, names, chunksize=chunk_size):
+            if error is None:
+                done += 1
+            else:
+                failed += 1
+    return done, failed
+
+
+def responsive_image(image):
+    """Варианты картинки для <picture>: srcset по форматам и размеры.
+
+    Миниатюры здесь не строятся: рендер не должен декодировать исходник.
+    Пока вариантов нет, возвращается исходная картинка без srcset, а
+    построение ставится в фоновый пул.
+    """
+    variants = cache.get(VARIANTS_KEY.format(image.name))
+    if variants is not None:
+        return variants
+    if cache.add(PENDING_KEY.format(image.name), True, PENDING_TIMEOUT):
+        schedule(image.name)
+    return {'src': {'url': image.url}}
+
+
+def _srcset(thumbnails):
+    return ', '.join(
+        f'{thumbnail.url} {thumbnail.width}w' for thumbnail in thumbnails
+    )
+
+
+def schedule(name):
+    """Ставит построение миниатюр картинки в фоновый пул после коммита."""
+    def submit():
+        global _executor
+        if _executor is None:
+            _executor = get_executor()
+        try:
+            _executor.submit(generate, name)
+        except BrokenProcessPool as error:
+            # Воркер не поднялся или упал: пул пересоздаётся при следующей
+            # задаче, а страница выводится с исходной картинкой.
+            logger.warning('Пул миниатюр недоступен: %s', error)
+            _executor = None
+
+    transaction.on_commit(submit)
+
+
+def pregenerate(post):
+    """Ставит построение миниатюр поста в фоновый пул после коммита."""
+    if post.image:
+        schedule(post.image.name)
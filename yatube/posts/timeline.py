@@ -0,0 +1,198 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Новый пост раздаётся во входящие (InboxEntry) всех подписчиков автора,
+поэтому страница ленты подписок выбирается по индексу входящих
+(user, pub_date, post), а из таблицы постов читаются только посты
+страницы. Посты авторов, у которых больше FANOUT_LIMIT подписчиков, не
+раздаются: они подмешиваются при чтении. Когда подписчиков у автора
+снова становится не больше FANOUT_LIMIT, его посты раздаются
+подписчикам задним числом (demote).
+"""
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .models import Follow, InboxEntry, Post, UserStats
+from .paginators import KeySource
+
+FANOUT_LIMIT = 1000
+BATCH_SIZE = 1000
+CELEBRITIES_CACHE_KEY = 'timeline:celebrities'
+CELEBRITIES_CACHE_TIMEOUT = 60 * 10
+REBUILD_SQL = (
+    'INSERT INTO posts_inboxentry (user_id, post_id, author_id, pub_date) '
+    'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+    'FROM posts_follow f JOIN posts_post p ON p.author_id = f.author_id'
+)
+DEMOTE_SQL = REBUILD_SQL + (
+    ' WHERE f.author_id = %s AND NOT EXISTS ('
+    'SELECT 1 FROM posts_inboxentry i '
+    'WHERE i.user_id = f.user_id AND i.post_id = p.id)'
+)
+
+
+def celebrity_ids():
+    """Авторы, чьи посты подмешиваются в ленту при чтении."""
+    ids = cache.get(CELEBRITIES_CACHE_KEY)
+    if ids is None:
+        ids = set(
+            UserStats.objects.filter(
+                followers_count__gt=FANOUT_LIMIT
+            ).values_list('user_id', flat=True)
+        )
+        cache.set(CELEBRITIES_CACHE_KEY, ids, CELEBRITIES_CACHE_TIMEOUT)
+    return ids
+
+
+def _entries(user_ids, posts):
+    return [
+        InboxEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for user_id in user_ids
+        for post_id, author_id, pub_date in posts
+    ]
+
+
+def _batched(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def fan_out(post):
+    """Раздаёт новый пост во входящие подписчиков автора."""
+    if post.author_id in celebrity_ids():
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    row = (post.pk, post.author_id, post.pub_date)
+    for batch in _batched(follower_ids.iterator()):
+        _save(batch, [row])
+
+
+def backfill(user_id, author_id):
+    """Добавляет во входящие подписчика уже опубликованные посты автора."""
+    if author_id in celebrity_ids():
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'author_id', 'pub_date'
+    )
+    for batch in _batched(posts.iterator()):
+        _save([user_id], batch)
+
+
+def prune(user_id, author_id):
+    """Убирает из входящих посты автора, от которого отписались."""
+    InboxEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def demote(author_id):
+    """Раздаёт посты автора, у которого подписчиков стало FANOUT_LIMIT.
+
+    Пока автор был популярным, его новые посты и подписки на него не
+    попадали во входящие. Вызывается после отписки, уменьшившей
+    followers_count.
+    """
+    followers_count = UserStats.objects.filter(
+        user_id=author_id
+    ).values_list('followers_count', flat=True).first()
+    if followers_count != FANOUT_LIMIT:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(DEMOTE_SQL, [author_id])
+    # Входящие уже полные: посты автора больше не подмешиваются.
+    cache.delete(CELEBRITIES_CACHE_KEY)
+
+
+def _save(user_ids, posts):
+    # Размер одного INSERT выбирает бэкенд: у SQLite предел на число
+    # строк в составном SELECT меньше BATCH_SIZE.
+    InboxEntry.objects.bulk_create(
+        _entries(user_ids, posts), ignore_conflicts=True,
+    )
+
+
+class Timeline:
+    """Лента подписок: входящие плюс посты популярных авторов."""
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def followed_celebrities(self):
+        return list(
+            Follow.objects.filter(
+                user=self.user, author_id__in=celebrity_ids()
+            ).values_list('author_id', flat=True)
+        )
+
+    def posts(self):
+        """Все посты ленты: для нумерованных страниц."""
+        if not self.followed_celebrities:
+            return Post.objects.filter(inbox_entries__user=self.user)
+        inbox = InboxEntry.objects.filter(user=self.user).values('post_id')
+        return Post.objects.filter(
+            Q(pk__in=inbox) | Q(author_id__in=self.followed_celebrities)
+        )
+
+    def keys(self):
+        """Источники ключей (pub_date, pk) для CursorPaginator."""
+        keys = [KeySource(
+            InboxEntry.objects.filter(user=self.user),
+            ('pub_date', 'post_id'),
+        )]
+        if self.followed_celebrities:
+            keys.append(KeySource(
+                Post.objects.filter(author_id__in=self.followed_celebrities),
+                ('pub_date', 'pk'),
+            ))
+        return keys
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def rebuild(user_ids=None):
+    """Пересобирает входящие с нуля по текущим подпискам.
+
+    Одним INSERT … SELECT, а не backfill на каждую подписку: при
+    массовой пересборке это на порядки быстрее.
+    """
+    cache.delete(CELEBRITIES_CACHE_KEY)
+    entries = InboxEntry.objects.all()
+    follows = Follow.objects.all()
+    conditions, params = [], []
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return 0
+        entries = entries.filter(user_id__in=user_ids)
+        follows = follows.filter(user_id__in=user_ids)
+        conditions.append(f'f.user_id IN ({_placeholders(user_ids)})')
+        params.extend(user_ids)
+    celebrities = list(celebrity_ids())
+    if celebrities:
+        conditions.append(
+            f'f.author_id NOT IN ({_placeholders(celebrities)})'
+        )
+        params.extend(celebrities)
+    sql = REBUILD_SQL
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    with transaction.atomic():
+        entries.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+    return follows.count()
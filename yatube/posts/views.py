@@ -1,27 +1,45 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import FloatField
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.utils.http import urlencode
 
+from . import caching, counters, feeds, search, thumbnails
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post
+from .paginators import CursorPaginator
 
 POSTS_ON_PAGE = 10
+COMMENTS_ON_PAGE = 20
 User = get_user_model()
 
 
-def paginator(request, posts, posts_on_page):
-    pages = Paginator(posts, posts_on_page)
-    page_number = request.GET.get('page')
-    return pages.get_page(page_number)
+def paginator(request, posts, posts_on_page, numbered=False, keys=None):
+    """Страница ленты: по курсору (?after=/?before=) или по номеру.
+
+    Нумерованный режим с COUNT(*) и OFFSET оставлен для небольших лент
+    и старых ссылок вида ?page=N.
+    """
+    if numbered or 'page' in request.GET:
+        pages = Paginator(posts, posts_on_page)
+        page_number = request.GET.get('page')
+        return pages.get_page(page_number)
+    pages = CursorPaginator(
+        posts,
+        posts_on_page,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        keys=keys,
+    )
+    return pages.get_page()
 
 
-@cache_page(60 * 20)
+@caching.cache_feed(lambda request: caching.INDEX)
 def index(request):
     template = 'posts/index.html'
-    posts = Post.objects.order_by('-pub_date')
-    page_obj = paginator(request, posts, POSTS_ON_PAGE)
+    page_obj = paginator(request, feeds.index_feed(), POSTS_ON_PAGE)
     title = 'Последние обновления на сайте'
     context = {
         'page_obj': page_obj,
@@ -30,11 +48,11 @@ def index(request):
     return render(request, template, context)
 
 
+@caching.cache_feed(lambda request, slug: caching.group_key(slug))
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts_group = group.posts.all().order_by('-pub_date')
-    page_obj = paginator(request, posts_group, POSTS_ON_PAGE)
+    page_obj = paginator(request, feeds.group_feed(group), POSTS_ON_PAGE)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -42,32 +60,83 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@caching.cache_feed(
+    lambda request, username: caching.author_key(username)
+)
 def profile(request, username):
     user_obj = get_object_or_404(User, username=username)
-    user_posts = user_obj.posts.all().order_by('-pub_date')
-    page_obj = paginator(request, user_posts, POSTS_ON_PAGE)
+    page_obj = paginator(
+        request, feeds.profile_feed(user_obj), POSTS_ON_PAGE
+    )
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user,
         author=user_obj).exists()
     context = {
         'page_obj': page_obj,
         'user_obj': user_obj,
+        'stats': counters.stats_for(user_obj),
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@caching.cache_feed(lambda request: caching.INDEX)
+def post_search(request):
+    """Поиск по тексту постов; результаты по релевантности (BM25)."""
+    query = request.GET.get('q', '').strip()
+    pages = CursorPaginator(
+        search.ranked(feeds.index_feed(), query),
+        POSTS_ON_PAGE,
+        ordering=('rank', '-pk'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        annotations={'rank': FloatField()},
+    )
+    context = {
+        'page_obj': pages.get_page(),
+        'query': query,
+        'query_string': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def comments_page(request, post):
+    pages = CursorPaginator(
+        feeds.post_comments(post),
+        COMMENTS_ON_PAGE,
+        ordering=('created', 'pk'),
+        after=request.GET.get('after'),
+    )
+    return pages.get_page()
+
+
+@caching.conditional_post(csrf=True)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
     form = CommentForm()
     context = {
         'post': post,
+        'author_stats': counters.stats_for(post.author),
         'form': form,
+        'comments': comments_page(request, post),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Фрагмент со следующей порцией комментариев для «Показать ещё»."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    context = {
+        'post': post,
+        'comments': comments_page(request, post),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -78,6 +147,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.pregenerate(post)
         return redirect('posts:profile', request.user.username)
 
     return render(request, 'posts/create_post.html', {'form': form})
@@ -97,6 +167,8 @@ def post_edit(request, post_id):
     )
     if request.method == 'POST' and form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.pregenerate(post)
         return redirect('posts:post_detail', post_id)
 
     context = {
@@ -108,6 +180,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -120,10 +193,10 @@ def add_comment(request, post_id):
 
 
 @login_required
+@caching.cache_feed(lambda request: caching.follow_keys(request.user.pk))
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user
-                                ).order_by('-pub_date')
-    page_obj = paginator(request, posts, POSTS_ON_PAGE)
+    posts, keys = feeds.follow_feed(request.user)
+    page_obj = paginator(request, posts, POSTS_ON_PAGE, keys=keys)
     context = {
         'page_obj': page_obj,
     }
@@ -131,6 +204,7 @@ def follow_index(request):
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = User.objects.get(username=username)
     if not Follow.objects.filter(
@@ -145,6 +219,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     Follow.objects.filter(
         user=request.user,
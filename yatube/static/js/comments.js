@@ -0,0 +1,18 @@
+// Кнопка «Показать ещё» подгружает следующую порцию комментариев
+// фрагментом и заменяет себя им. Без JS кнопка ведёт на страницу поста
+// с той же порцией.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('[data-comments-more]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  fetch(link.dataset.url, {credentials: 'same-origin'})
+    .then(function (response) {
+      return response.text();
+    })
+    .then(function (html) {
+      link.insertAdjacentHTML('afterend', html);
+      link.remove();
+    });
+});
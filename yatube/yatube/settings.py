@@ -46,25 +46,32 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
 
     'sorl.thumbnail',
-    'debug_toolbar',
 
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.SamplingProfilerMiddleware',
+    'core.middleware.QueryLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# debug_toolbar тяжёл для продакшена: подключается только при DEBUG.
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
@@ -93,12 +100,37 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# PRAGMA и режим транзакций для конкурентной записи описаны в
+# core/backends/sqlite3/base.py.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': 5000,
+                'mmap_size': 256 * 1024 * 1024,
+                'cache_size': -64 * 1024,
+            },
+        },
     }
 }
+# Реплика для чтения лент: копия default, которую обновляет
+# refresh_replicas. Пока файла нет, всё читается из default.
+DATABASES['replica'] = dict(
+    DATABASES['default'],
+    NAME=os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+    TEST={'MIRROR': 'default'},
+)
+DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# Сколько секунд после своей записи пользователь читает из default:
+# не меньше интервала refresh_replicas.
+REPLICA_PIN_SECONDS = 60
 
 
 # Password validation
@@ -147,15 +179,33 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+THUMBNAIL_PRESERVE_FORMAT = True
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
+# Тесты держат кэш и журнал запросов во временном каталоге, чтобы
+# cache.clear() не стирал кэш dev-сервера.
+TEST_RUNNER = 'core.testing.TestRunner'
+
+# Доля запросов, которые профилирует core.middleware и сколько последних
+# профилей хранить (см. core/profiling.py).
+PROFILER_SAMPLE_RATE = 0.01
+PROFILER_BUFFER_SIZE = 1000
+# Журнал запросов по отпечаткам (core/querylog.py): куда писать и с
+# какого времени в миллисекундах снимать EXPLAIN QUERY PLAN.
+QUERYLOG_PATH = os.path.join(BASE_DIR, 'querylog.sqlite3')
+QUERYLOG_SLOW_MS = 100
 # Добавьте IP адреса, при обращении с которых будет доступен DjDT
 INTERNAL_IPS = [
     '127.0.0.1',